@@ -0,0 +1,111 @@
+"""Append-only log of bot actions with cursor-based reads.
+
+Every action gets a sequence number that only ever increases, so a client that
+remembers the last sequence number it saw can fetch everything after it in one
+request, including after a reconnect. Subscribers acknowledge what they have
+read; entries every subscriber has acknowledged are compacted away, and the log
+never holds more than ``max_entries`` regardless. Subscribers that have not
+acknowledged anything for ``subscriber_ttl`` seconds are forgotten, and at
+most ``max_subscribers`` are tracked (the longest idle go first), so clients
+that disappear neither pin old entries nor accumulate.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+class ActionLog:
+    def __init__(self, max_entries: int = 10_000, subscriber_ttl: float = 600.0, max_subscribers: int = 32):
+        self.max_entries = max_entries
+        self.subscriber_ttl = subscriber_ttl
+        self.max_subscribers = max_subscribers
+        # (sequence number, action), oldest first
+        self._entries: Deque[Tuple[int, Dict]] = deque()
+        self._next_seq = 1
+        # Highest sequence number each subscriber has acknowledged and when
+        # (time.monotonic()), least recently acknowledging first
+        self._acked: OrderedDict[str, Tuple[int, float]] = OrderedDict()
+        # Actions appended while held (see hold), not yet numbered or readable
+        self._held: Optional[List[Dict]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest action, 0 if none was ever appended."""
+        return self._next_seq - 1
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest action still held."""
+        return self._entries[0][0] if self._entries else self._next_seq
+
+    def append(self, action: Dict) -> Optional[int]:
+        """Log ``action`` and return its sequence number, or None while held."""
+        if self._held is not None:
+            self._held.append(action)
+            return None
+        seq = self._next_seq
+        self._next_seq += 1
+        self._entries.append((seq, action))
+        if len(self._entries) > self.max_entries:
+            self._entries.popleft()
+        return seq
+
+    def read(self, after: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Actions with a sequence number greater than ``after``, oldest first."""
+        if not self._entries or after >= self.last_seq:
+            return []
+        # Sequence numbers are contiguous, so the start is a direct offset
+        start = max(0, after + 1 - self.first_seq)
+        stop = len(self._entries) if limit is None else min(len(self._entries), start + limit)
+        return [{"seq": self._entries[i][0], "action": self._entries[i][1]} for i in range(start, stop)]
+
+    def hold(self) -> None:
+        """Keep actions appended from now on unpublished until :meth:`release`,
+        e.g. while the moves causing them may still be rolled back."""
+        self._held = []
+
+    def release(self, publish: bool = True) -> None:
+        """Publish the held actions, or drop them if ``publish`` is false.
+
+        Held actions only get a sequence number once published, so numbers
+        are never handed out for actions that are then taken back.
+        """
+        held, self._held = self._held or [], None
+        if publish:
+            for action in held:
+                self.append(action)
+
+    def ack(self, subscriber: str, seq: int) -> None:
+        """Record that ``subscriber`` has read everything up to ``seq`` and compact."""
+        now = time.monotonic()
+        seq = max(min(seq, self.last_seq), self._acked.pop(subscriber, (0, now))[0])
+        self._acked[subscriber] = (seq, now)
+        self._expire(now)
+        self.compact()
+
+    def unsubscribe(self, subscriber: str) -> None:
+        self._acked.pop(subscriber, None)
+        self.compact()
+
+    def _expire(self, now: float) -> None:
+        """Forget subscribers idle for longer than the TTL or beyond the cap."""
+        acked = self._acked
+        while acked and (len(acked) > self.max_subscribers or now - next(iter(acked.values()))[1] > self.subscriber_ttl):
+            acked.popitem(last=False)
+
+    def compact(self) -> None:
+        """Drop the entries every subscriber has acknowledged."""
+        if not self._acked:
+            return
+        floor = min(seq for seq, _ in self._acked.values())
+        while self._entries and self._entries[0][0] <= floor:
+            self._entries.popleft()
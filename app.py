@@ -1,45 +1,107 @@
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, session
+from battle import MAX_ARMIES, attack_odds
+from expectimax import ExpectimaxBot
 from game import Game, GamePhase
+from jobs import BotTurnRunner, JobQueueFull
+from mcts import MCTSBot
+from registry import GameRegistry
+from risk_board import DEFAULT_MAP, Board
 import json
+import math
+import os
 
 app = Flask(__name__)
-game = Game()
+# Signs the session cookie that carries each browser's game ID
+app.secret_key = os.environ.get("RISK_SECRET_KEY") or os.urandom(32)
+
+BOT_STRATEGIES = ("heuristic", "mcts", "expectimax")
+DEFAULT_BOT_STRATEGY = os.environ.get("RISK_BOT_STRATEGY", "heuristic")
+MCTS_TIME_BUDGET = float(os.environ.get("RISK_MCTS_TIME", 0.5))
+MCTS_PROCESSES = int(os.environ.get("RISK_MCTS_PROCESSES", 1))
+
+def make_bot_strategy(name, time_budget=None, iterations=None):
+    """Strategy object for a bot player; None selects the built-in heuristic bot."""
+    if name == "heuristic":
+        return None
+    if name == "mcts":
+        return MCTSBot(
+            time_budget=MCTS_TIME_BUDGET if time_budget is None and iterations is None else time_budget,
+            iterations=iterations,
+            processes=MCTS_PROCESSES,
+        )
+    if name == "expectimax":
+        return ExpectimaxBot()
+    raise ValueError(f"Unknown bot strategy {name!r}")
+
+MAP_NAME = os.environ.get("RISK_MAP", DEFAULT_MAP)
+
+def new_game():
+    game = Game(board=Board.load(MAP_NAME))
+    game.bot.strategy = make_bot_strategy(DEFAULT_BOT_STRATEGY)
+    return game
+
+games = GameRegistry(
+    factory=new_game,
+    max_games=int(os.environ.get("RISK_MAX_GAMES", 500)),
+    idle_timeout=float(os.environ.get("RISK_IDLE_TIMEOUT", 3600)),
+    spill_dir=os.environ.get("RISK_SPILL_DIR") or None,
+)
+
+def current_game_id():
+    # Only the signed session picks the game, so clients cannot reach each other's
+    if "game_id" not in session:
+        session["game_id"] = games.new_game_id()
+    return session["game_id"]
+
+def current_game():
+    return games.lease(current_game_id())
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/game_state')
-def get_game_state():
+@app.route('/api/topology')
+def get_topology():
+    with current_game() as game:
+        # Serialised once per map and shared by every game on it
+        body, etag = game.board.topology_json
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Let browsers keep it but revalidate, which is a cheap 304
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def state_payload(game, since=None):
+    """Game state for the client; with ``since`` only territories changed after that version."""
+    if since is None or since < 0 or since > game.version:
+        changed = range(len(game.owners))
+    else:
+        changed = game.changed_since(since)
+
+    names = game.board.territories
     nodes = []
-    for territory, (x, y) in game.board.positions.items():
-        owner = game.territory_owner[territory]
-        armies = game.armies[territory]
-        
+    for i in changed:
+        territory = names[i]
+        owner = game.players[game.owners[i]]
         nodes.append({
             "id": territory,
-            "label": f"{territory}\n{armies}",
+            "label": f"{territory}\n{game.army_counts[i]}",
             "group": owner.name,
             "owner": owner.name,
-            "x": x * 1.5, # Scaling factor for better spacing
-            "y": y * 1.5  # Scaling factor for better spacing
         })
 
-
-    edges = []
-    for territory, neighbors in game.board.adjacency.items():
-        for neighbor in neighbors:
-            if territory < neighbor:
-                edges.append({"from": territory, "to": neighbor})
-
     human_cards = [
         {"territory": card.territory, "card_type": card.card_type} 
         for card in game.human.cards
     ]
 
     state = {
+        "version": game.version,
+        "full": isinstance(changed, range),
         "nodes": nodes,
-        "edges": edges,
         "phase": game.phase.value,
         "players": [p.name for p in game.players],
         "reinforcements": game.reinforcements,
@@ -48,96 +110,359 @@ def get_game_state():
         "human_cards": human_cards,
         "conquest_move_details": game.conquest_move_details
     }
-    
+
     if game.phase == GamePhase.GAME_OVER:
         winner_name = [p.name for p in game.players if p.has_territories(game)][0]
         state["winner"] = winner_name
 
-    return jsonify(state)
+    return state
 
-@app.route('/api/deploy', methods=['POST'])
-def deploy():
-    data = request.json
-    territory = data["territory"]
-    armies = int(data["armies"])
-    success = game.deploy(game.human, territory, armies)
+# Bot turns run on a bounded worker pool, off the request threads
+bot_turns = BotTurnRunner(
+    games,
+    state_payload,
+    max_workers=int(os.environ.get("RISK_BOT_WORKERS", 4)),
+    time_budget=float(os.environ.get("RISK_BOT_TIME_BUDGET", 5)),
+)
+
+@app.route('/api/game_state')
+def get_game_state():
+    # With ?since=<version> only territories changed after that version are sent
+    since = request.args.get("since", type=int)
+    with current_game() as game:
+        return jsonify(state_payload(game, since))
+
+# Player commands, shared by the single-action routes and /api/batch
+
+def cmd_deploy(game, data):
+    success = game.deploy(game.human, data["territory"], int(data["armies"]))
     if success and game.reinforcements == 0:
         game.next_phase()
-    return jsonify({"success": success})
+    return {"success": success}
+
+def cmd_attack(game, data):
+    return game.attack(game.human, data["from_terr"], data["to_terr"], int(data.get("armies", 1)))
+
+def cmd_blitz(game, data):
+    max_rounds = data.get("max_rounds")
+    return game.blitz(
+        game.human, data["from_terr"], data["to_terr"],
+        stop_at=int(data.get("stop_at", 1)),
+        max_rounds=int(max_rounds) if max_rounds is not None else None,
+        sample=bool(data.get("sample", False)),
+    )
+
+def cmd_move_after_conquest(game, data):
+    return game.move_after_conquest(game.human, int(data["armies"]))
+
+def cmd_fortify(game, data):
+    success = game.fortify(game.human, data["from_terr"], data["to_terr"], int(data["armies"]))
+    return {"success": success}
+
+def cmd_next_phase(game, data):
+    if game.phase == GamePhase.ATTACK_MOVE:
+        return {"success": False, "error": "Must move armies after conquest before ending phase."}
+    game.next_phase()
+    return {"success": True}
+
+def cmd_trade_in_cards(game, data):
+    return game.trade_in_cards(game.human, data.get("card_indices", []))
+
+COMMANDS = {
+    "deploy": cmd_deploy,
+    "attack": cmd_attack,
+    "blitz": cmd_blitz,
+    "move_after_conquest": cmd_move_after_conquest,
+    "fortify": cmd_fortify,
+    "next_phase": cmd_next_phase,
+    "trade_in_cards": cmd_trade_in_cards,
+}
+
+def run_command(game, name, data):
+    try:
+        return COMMANDS[name](game, data)
+    except (KeyError, TypeError, ValueError):
+        return {"success": False, "error": f"Malformed {name} command."}
+
+@app.route('/api/deploy', methods=['POST'])
+def deploy():
+    with current_game() as game:
+        return jsonify(run_command(game, "deploy", request.json))
 
 @app.route('/api/attack', methods=['POST'])
 def attack():
-    data = request.json
-    from_terr = data["from_terr"]
-    to_terr = data["to_terr"]
-    armies = int(data.get("armies", 1))
-    result = game.attack(game.human, from_terr, to_terr, armies)
+    with current_game() as game:
+        return jsonify(run_command(game, "attack", request.json))
+
+@app.route('/api/blitz', methods=['POST'])
+def blitz():
+    with current_game() as game:
+        return jsonify(run_command(game, "blitz", request.json))
+
+@app.route('/api/attack_odds')
+def get_attack_odds():
+    # Either explicit army counts or a pair of territories on the current board
+    args = request.args
+    try:
+        if "from_terr" in args:
+            with current_game() as game:
+                attackers = game.armies[args["from_terr"]] - 1
+                defenders = game.armies[args["to_terr"]]
+        else:
+            attackers = int(args["attackers"])
+            defenders = int(args["defenders"])
+        stop = int(args.get("stop", 0))
+    except (KeyError, ValueError):
+        return jsonify({"success": False, "error": "Give from_terr/to_terr or attackers/defenders."}), 400
+    if attackers < 0 or defenders < 0 or stop < 0:
+        return jsonify({"success": False, "error": "Army counts must be non-negative."}), 400
+    if attackers > MAX_ARMIES or defenders > MAX_ARMIES:
+        return jsonify({"success": False, "error": f"Army counts are limited to {MAX_ARMIES}."}), 400
+
+    odds = attack_odds(attackers, defenders, stop)
+    result = odds.to_dict(include_outcomes=args.get("outcomes") == "1")
+    result["success"] = True
     return jsonify(result)
 
 @app.route('/api/move_after_conquest', methods=['POST'])
 def move_after_conquest():
-    data = request.json
-    num_armies = int(data['armies'])
-    result = game.move_after_conquest(game.human, num_armies)
-    return jsonify(result)
+    with current_game() as game:
+        return jsonify(run_command(game, "move_after_conquest", request.json))
 
 @app.route('/api/fortify', methods=['POST'])
 def fortify():
-    data = request.json
-    from_terr = data["from_terr"]
-    to_terr = data["to_terr"]
-    armies = int(data["armies"])
-    success = game.fortify(game.human, from_terr, to_terr, armies)
-    return jsonify({"success": success})
+    with current_game() as game:
+        return jsonify(run_command(game, "fortify", request.json))
 
 @app.route('/api/next_phase', methods=['POST'])
 def next_phase():
-    if game.phase == GamePhase.ATTACK_MOVE:
-        return jsonify({"success": False, "error": "Must move armies after conquest before ending phase."})
-    game.next_phase()
-    return jsonify({"success": True})
+    with current_game() as game:
+        return jsonify(run_command(game, "next_phase", {}))
 
 @app.route('/api/trade_in_cards', methods=['POST'])
 def trade_in_cards():
-    data = request.json
-    card_indices = data.get("card_indices", [])
-    result = game.trade_in_cards(game.human, card_indices)
-    return jsonify(result)
+    with current_game() as game:
+        return jsonify(run_command(game, "trade_in_cards", request.json))
+
+@app.route('/api/undo', methods=['POST'])
+def undo():
+    """Take back the human's last deploy or fortify move of the current turn."""
+    with current_game() as game:
+        if game.players[game.current_player_index] is not game.human:
+            return jsonify({"success": False, "error": "Not your turn."})
+        undone = game.undo(("deploy", "fortify"))
+        if undone is None:
+            return jsonify({"success": False, "error": "Nothing to undo."})
+        return jsonify({"success": True, "undone": undone})
+
+@app.route('/api/bot_strategy', methods=['GET', 'POST'])
+def bot_strategy():
+    """Show or choose how the bot plays this game: "heuristic", "mcts" or "expectimax"."""
+    with current_game() as game:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            name = data.get("strategy")
+            if name not in BOT_STRATEGIES:
+                return jsonify({"success": False, "error": f"strategy must be one of {', '.join(BOT_STRATEGIES)}."}), 400
+            try:
+                time_budget = data.get("time_budget")
+                iterations = data.get("iterations")
+                game.bot.strategy = make_bot_strategy(
+                    name,
+                    time_budget=None if time_budget is None else float(time_budget),
+                    iterations=None if iterations is None else int(iterations),
+                )
+            except (TypeError, ValueError) as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+
+        strategy = game.bot.strategy
+        info = {"success": True, "strategy": "heuristic"}
+        if isinstance(strategy, ExpectimaxBot):
+            info.update({"strategy": "expectimax", "depth": strategy.depth, "last_search": strategy.last_search})
+        elif isinstance(strategy, MCTSBot):
+            info.update({
+                "strategy": "mcts",
+                "time_budget": strategy.time_budget,
+                "iterations": strategy.iterations,
+                "processes": strategy.processes,
+                "last_search": strategy.last_search,
+                "iterations_per_second": round(strategy.iterations_per_second),
+            })
+        return jsonify(info)
+
+MAX_BATCH_COMMANDS = 100
+# Commands that roll dice; undoing them would let a client reroll until it wins
+DICE_COMMANDS = ("attack", "blitz")
+
+@app.route('/api/batch', methods=['POST'])
+def batch():
+    """Apply an ordered list of commands under one lock and return one state delta.
+
+    ``mode`` is "atomic" (undo everything if any command fails) or
+    "stop_on_error" (keep what succeeded and skip the rest). Atomic batches
+    cannot roll dice.
+    """
+    data = request.get_json(silent=True) or {}
+    commands = data.get("commands")
+    mode = data.get("mode", "stop_on_error")
+    since = data.get("since")
+    if not isinstance(commands, list) or len(commands) > MAX_BATCH_COMMANDS:
+        return jsonify({"success": False, "error": f"commands must be a list of at most {MAX_BATCH_COMMANDS}."}), 400
+    if mode not in ("atomic", "stop_on_error"):
+        return jsonify({"success": False, "error": "mode must be atomic or stop_on_error."}), 400
+    if mode == "atomic" and any(isinstance(c, dict) and c.get("type") in DICE_COMMANDS for c in commands):
+        return jsonify({"success": False, "error": "Atomic batches cannot attack; dice rolls cannot be undone."}), 400
+
+    with current_game() as game:
+        snapshot = game.snapshot() if mode == "atomic" else None
+        if snapshot is not None:
+            # Bot actions logged by the batch (e.g. announcing the bot's turn)
+            # are only published if it commits
+            game.bot_actions.hold()
+        results = []
+        failed = False
+        try:
+            for command in commands:
+                name = command.get("type") if isinstance(command, dict) else None
+                if name not in COMMANDS:
+                    result = {"success": False, "error": f"Unknown command {name!r}."}
+                else:
+                    result = run_command(game, name, command)
+                results.append(result)
+                if not result.get("success"):
+                    failed = True
+                    break
+        except Exception:
+            if snapshot is not None:
+                game.restore(snapshot)
+                game.bot_actions.release(publish=False)
+            raise
+
+        rolled_back = failed and snapshot is not None
+        if rolled_back:
+            game.restore(snapshot)
+        if snapshot is not None:
+            game.bot_actions.release(publish=not rolled_back)
+        return jsonify({
+            "success": not failed,
+            "applied": 0 if rolled_back else len(results) - failed,
+            "rolled_back": rolled_back,
+            "results": results,
+            "state": state_payload(game, since if isinstance(since, int) else None),
+        })
 
 @app.route('/api/restart', methods=['POST'])
 def restart():
-    game.restart()
-    return jsonify({"success": True})
-
-@app.route('/api/bot_action', methods=['GET'])
-def bot_action():
-    # Return the next bot action from the queue, or empty if none left
-    if game.bot_actions:
-        action = game.bot_actions.pop(0)
-        return jsonify({"action": action})
+    with current_game() as game:
+        game.restart()
+        return jsonify({"success": True})
+
+MAX_ACTIONS_PER_PAGE = 500
+
+@app.route('/api/bot_actions', methods=['GET'])
+def bot_actions():
+    """Return every logged bot action after the ``after`` cursor in one response.
+
+    A client that passes a ``subscriber`` ID acknowledges everything up to
+    ``after`` by doing so; actions all subscribers have acknowledged are
+    dropped from the log.
+    """
+    after = request.args.get("after", default=0, type=int)
+    limit = min(request.args.get("limit", default=MAX_ACTIONS_PER_PAGE, type=int), MAX_ACTIONS_PER_PAGE)
+    subscriber = request.args.get("subscriber")
+    with current_game() as game:
+        log = game.bot_actions
+        if subscriber:
+            log.ack(subscriber, after)
+        actions = log.read(after, limit)
+        return jsonify({
+            "actions": actions,
+            "cursor": actions[-1]["seq"] if actions else max(after, 0),
+            "last_seq": log.last_seq,
+            # Actions between the cursor and the oldest one kept were compacted away
+            "missed": after + 1 < log.first_seq and log.last_seq > after,
+        })
+
+def session_job(job_id):
+    """The bot job with this ID if it belongs to the caller's game, else None."""
+    job = bot_turns.get(job_id)
+    if job is None or job.game_id != current_game_id():
+        return None
+    return job
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/bot_stream')
+def bot_stream():
+    """Push the actions of a bot turn, each with the state delta it caused, as Server-Sent Events.
+
+    Follows ``?job_id=`` if given, otherwise starts (or joins) the bot turn of the caller's game.
+    """
+    job_id = request.args.get("job_id")
+    if job_id:
+        job = session_job(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": "Unknown job."}), 404
     else:
-        return jsonify({"action": None})
+        try:
+            job = bot_turns.submit(current_game_id(), since=request.args.get("since", type=int))
+        except JobQueueFull as e:
+            return jsonify({"success": False, "error": str(e)}), 503
+
+    def generate():
+        for event, data in job.follow():
+            if event == "keepalive":
+                yield ": keepalive\n\n"
+            else:
+                yield sse_event(event, data)
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route('/api/execute_bot_turn', methods=['POST'])
 def execute_bot_turn():
-    # Execute the bot's turn if it's currently the bot's turn
-    print(f"Execute bot turn called. Current player index: {game.current_player_index}")
-    print(f"Current player: {game.players[game.current_player_index].name}, is_bot: {game.players[game.current_player_index].is_bot}")
-    
-    if game.current_player_index < len(game.players) and game.players[game.current_player_index].is_bot:
+    # Queue the bot's turn and return immediately; follow it via /api/bot_job or /api/bot_stream
+    data = request.get_json(silent=True) or {}
+    time_budget = data.get("time_budget")
+    if time_budget is not None:
         try:
-            print("Starting bot turn execution")
-            game.run_bot_turn()
-            print("Bot turn execution completed successfully")
-            return jsonify({"success": True, "message": "Bot turn executed successfully"})
-        except Exception as e:
-            print(f"Error executing bot turn: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({"success": False, "error": str(e)}), 500
-    else:
-        print("Attempted to execute bot turn but it's not the bot's turn")
-        return jsonify({"success": False, "error": "Not the bot's turn"}), 400
+            time_budget = float(time_budget)
+        except (TypeError, ValueError):
+            time_budget = math.nan
+        if not math.isfinite(time_budget) or time_budget <= 0:
+            return jsonify({"success": False, "error": "time_budget must be a positive number of seconds."}), 400
+        # Clients may ask for less time than the server allows, never more
+        if bot_turns.time_budget is not None:
+            time_budget = min(time_budget, bot_turns.time_budget)
+    with current_game() as game:
+        if not game.players[game.current_player_index].is_bot:
+            print("Attempted to execute bot turn but it's not the bot's turn")
+            return jsonify({"success": False, "error": "Not the bot's turn"}), 400
+    try:
+        job = bot_turns.submit(
+            current_game_id(),
+            since=data.get("since"),
+            time_budget=time_budget,
+        )
+    except JobQueueFull as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    print(f"Queued bot turn job {job.job_id}")
+    return jsonify({"success": True, "job_id": job.job_id, "status": job.status}), 202
+
+@app.route('/api/bot_job/<job_id>')
+def bot_job(job_id):
+    job = session_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown job."}), 404
+    return jsonify({"success": True, **job.to_dict()})
+
+@app.route('/api/bot_job/<job_id>/cancel', methods=['POST'])
+def cancel_bot_job(job_id):
+    if session_job(job_id) is None:
+        return jsonify({"success": False, "error": "Unknown job."}), 404
+    job = bot_turns.cancel(job_id)
+    return jsonify({"success": True, **job.to_dict()})
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
@@ -0,0 +1,203 @@
+"""Exact battle outcome probabilities for Risk dice.
+
+A battle is a Markov chain over ``(attackers, defenders)``. ``attackers`` is the
+number of armies the attacker can commit, i.e. the attacking territory's armies
+minus the one that must stay behind. Every round the attacker rolls
+``min(3, attackers)`` dice and the defender ``min(2, defenders)`` dice, exactly
+as in :meth:`game.Game.attack`. The battle ends when the defender is wiped out
+or the attacker is down to ``stop`` committed armies.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, List, Tuple
+
+State = Tuple[int, int]
+
+# Computing a distribution costs O(attackers * defenders). Requests for more
+# armies than this are refused, and sampled blitzes over more states than
+# MAX_SAMPLED_STATES roll their dice instead.
+MAX_ARMIES = 200
+MAX_SAMPLED_STATES = 40_000
+
+
+def _round_outcomes(attack_dice: int, defend_dice: int) -> Tuple[Tuple[int, int, float], ...]:
+    """Enumerate every roll to get ``(attacker losses, defender losses, probability)``."""
+    counts: Dict[Tuple[int, int], int] = {}
+    for rolls in product(range(1, 7), repeat=attack_dice + defend_dice):
+        attack_rolls = sorted(rolls[:attack_dice], reverse=True)
+        defend_rolls = sorted(rolls[attack_dice:], reverse=True)
+        attack_losses = defend_losses = 0
+        for a_roll, d_roll in zip(attack_rolls, defend_rolls):
+            if a_roll > d_roll:
+                defend_losses += 1
+            else:
+                attack_losses += 1
+        key = (attack_losses, defend_losses)
+        counts[key] = counts.get(key, 0) + 1
+    total = 6 ** (attack_dice + defend_dice)
+    return tuple((al, dl, n / total) for (al, dl), n in sorted(counts.items()))
+
+
+# Single-round loss distribution for every (attack dice, defend dice) pair
+ROUND_OUTCOMES: Dict[Tuple[int, int], Tuple[Tuple[int, int, float], ...]] = {
+    (a, d): _round_outcomes(a, d) for a in range(1, 4) for d in range(1, 3)
+}
+
+
+def battle_distribution(attackers: int, defenders: int, stop: int = 0) -> Dict[State, float]:
+    """Probability of every terminal ``(attackers, defenders)`` state of a battle."""
+    if attackers < 0 or defenders < 0 or stop < 0:
+        raise ValueError("Army counts must be non-negative")
+
+    mass: Dict[State, float] = {(attackers, defenders): 1.0}
+    result: Dict[State, float] = {}
+    # Every round removes at least one army, so sweeping states by descending
+    # total visits each state after all of its predecessors.
+    for total in range(attackers + defenders, -1, -1):
+        for a in range(min(total, attackers), max(0, total - defenders) - 1, -1):
+            d = total - a
+            p = mass.pop((a, d), 0.0)
+            if not p:
+                continue
+            if d == 0 or a <= stop:
+                result[(a, d)] = result.get((a, d), 0.0) + p
+                continue
+            for attack_losses, defend_losses, q in ROUND_OUTCOMES[(min(3, a), min(2, d))]:
+                nxt = (a - attack_losses, d - defend_losses)
+                mass[nxt] = mass.get(nxt, 0.0) + p * q
+    return result
+
+
+@dataclass(frozen=True)
+class BattleOdds:
+    attackers: int
+    defenders: int
+    stop: int
+    win_probability: float
+    expected_attackers: float  # Committed attackers left, excluding the army left behind
+    expected_defenders: float
+    outcomes: Tuple[Tuple[State, float], ...]
+
+    @classmethod
+    def compute(cls, attackers: int, defenders: int, stop: int = 0) -> BattleOdds:
+        dist = battle_distribution(attackers, defenders, stop)
+        return cls(
+            attackers=attackers,
+            defenders=defenders,
+            stop=stop,
+            win_probability=sum((p for (_, d), p in dist.items() if d == 0), 0.0),
+            expected_attackers=sum(a * p for (a, _), p in dist.items()),
+            expected_defenders=sum(d * p for (_, d), p in dist.items()),
+            outcomes=tuple(sorted(dist.items())),
+        )
+
+    def to_dict(self, include_outcomes: bool = False) -> Dict:
+        data = {
+            "attackers": self.attackers,
+            "defenders": self.defenders,
+            "stop": self.stop,
+            "win_probability": self.win_probability,
+            "expected_attackers": self.expected_attackers,
+            "expected_defenders": self.expected_defenders,
+        }
+        if include_outcomes:
+            data["outcomes"] = [[a, d, p] for (a, d), p in self.outcomes]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> BattleOdds:
+        return cls(
+            attackers=data["attackers"],
+            defenders=data["defenders"],
+            stop=data["stop"],
+            win_probability=data["win_probability"],
+            expected_attackers=data["expected_attackers"],
+            expected_defenders=data["expected_defenders"],
+            outcomes=tuple(((a, d), p) for a, d, p in data["outcomes"]),
+        )
+
+
+class OddsTable:
+    """Bounded LRU memo of :class:`BattleOdds` that can be persisted as JSON.
+
+    Holds at most ``maxsize`` entries and ``max_outcomes`` outcomes in total,
+    since one large battle stores as many outcomes as it has armies.
+    """
+
+    def __init__(self, maxsize: int = 4096, max_outcomes: int = 250_000):
+        self.maxsize = maxsize
+        self.max_outcomes = max_outcomes
+        self._entries: OrderedDict[Tuple[int, int, int], BattleOdds] = OrderedDict()
+        self._outcomes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, attackers: int, defenders: int, stop: int = 0) -> BattleOdds:
+        key = (attackers, defenders, stop)
+        with self._lock:
+            odds = self._entries.get(key)
+            if odds is not None:
+                self._entries.move_to_end(key)
+                return odds
+        odds = BattleOdds.compute(attackers, defenders, stop)
+        with self._lock:
+            self._add(key, odds)
+        return odds
+
+    def _add(self, key: Tuple[int, int, int], odds: BattleOdds) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._outcomes -= len(old.outcomes)
+        self._entries[key] = odds
+        self._outcomes += len(odds.outcomes)
+        # Evict least recently used entries, but always keep the newest
+        while len(self._entries) > 1 and (len(self._entries) > self.maxsize or self._outcomes > self.max_outcomes):
+            _, evicted = self._entries.popitem(last=False)
+            self._outcomes -= len(evicted.outcomes)
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            entries = [odds.to_dict(include_outcomes=True) for odds in self._entries.values()]
+        with open(path, "w") as f:
+            json.dump(entries, f)
+
+    @classmethod
+    def load(cls, path: str, maxsize: int = 4096, max_outcomes: int = 250_000) -> OddsTable:
+        table = cls(maxsize, max_outcomes)
+        with open(path) as f:
+            entries: List[Dict] = json.load(f)
+        for data in entries[-maxsize:]:
+            odds = BattleOdds.from_dict(data)
+            table._add((odds.attackers, odds.defenders, odds.stop), odds)
+        return table
+
+
+# Shared table used by the game server and bots
+ODDS = OddsTable()
+
+
+def attack_odds(attackers: int, defenders: int, stop: int = 0) -> BattleOdds:
+    return ODDS.get(attackers, defenders, stop)
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print exact Risk battle odds")
+    parser.add_argument("attackers", type=int, help="Armies the attacker can commit")
+    parser.add_argument("defenders", type=int, help="Defending armies")
+    parser.add_argument("--stop", type=int, default=0, help="Stop once the attacker is down to this many armies")
+    args = parser.parse_args()
+    print(json.dumps(attack_odds(args.attackers, args.defenders, args.stop).to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Benchmarks for the engine's hot paths, bot turns and the state API.
+
+Every case is seeded, so runs on one machine measure the same work. Each
+case reports operations per second and per-operation latency percentiles.
+Results can be saved as a JSON baseline, and later runs compared against it,
+flagging cases whose median throughput dropped by more than a threshold::
+
+    python bench.py --save bench_baseline.json
+    python bench.py --baseline bench_baseline.json --threshold 0.15
+
+The comparison exits with status 1 when any case regressed.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import platform
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game import Game, GamePhase
+from simulate import play_game
+
+# A case's setup takes the seed and returns the operation to time and,
+# optionally, a reset run untimed before every sample
+Setup = Callable[[int], Tuple[Callable[[], object], Optional[Callable[[], None]]]]
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Setup
+    samples: int
+    # Operations per timed sample; batches operations too fast to time singly
+    inner: int = 1
+
+
+@dataclass
+class CaseResult:
+    samples: int
+    ops_per_sec: float
+    median_ops_per_sec: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+
+
+def _bot_game(seed: int) -> Game:
+    game = Game(verbose=False, seed=seed)
+    for player in game.players:
+        player.is_bot = True
+    return game
+
+
+def _attack_setup(seed: int):
+    game = Game(verbose=False, seed=seed)
+    attacker = game.players[game.current_player_index]
+    game.phase = GamePhase.ATTACK
+    src = attacker.get_territories(game)[0]
+    dst = next(n for n in game.board.adjacency[src] if game.territory_owner[n] != attacker)
+    # Stacks too large to run out while the case repeats the same battle
+    game.armies[src] = game.armies[dst] = 1_000_000
+
+    def op():
+        # Each attack records its undo; drop it so the stack does not grow across samples
+        game.undo_stack.clear()
+        return game.attack(attacker, src, dst, 3)
+
+    return op, None
+
+
+def _fortify_setup(seed: int):
+    game = Game(verbose=False, seed=seed)
+    player = game.players[game.current_player_index]
+    game.phase = GamePhase.FORTIFY
+    # Walk territories in board order; set order varies with string hashing
+    owned = set(player.get_territories(game))
+    src = next(t for t in game.board.territories if t in owned and any(n in owned for n in game.board.adjacency[t]))
+    dst = next(n for n in game.board.adjacency[src] if n in owned)
+    game.armies[src] = game.armies[dst] = 1_000_000
+    route = [(src, dst), (dst, src)]
+    turn = [0]
+
+    def op():
+        game.fortified_this_turn = False
+        game.undo_stack.clear()
+        a, b = route[turn[0] & 1]
+        turn[0] += 1
+        return game.fortify(player, a, b, 1)
+
+    return op, None
+
+
+def _board_are_connected_setup(seed: int):
+    game = Game(verbose=False, seed=seed)
+    player = game.players[game.current_player_index]
+    owned = player.get_territories(game)
+    pairs = [(a, b) for a in owned for b in owned if a != b]
+    random.Random(seed).shuffle(pairs)
+    owner_of = {t: game.territory_owner[t] for t in game.board.territories}
+    pos = [0]
+
+    def op():
+        a, b = pairs[pos[0] % len(pairs)]
+        pos[0] += 1
+        return game.board.are_connected(a, b, player, owner_of)
+
+    return op, None
+
+
+def _reinforcements_setup(seed: int):
+    game = Game(verbose=False, seed=seed)
+    player = game.players[game.current_player_index]
+    return (lambda: game._calculate_reinforcements(player)), None
+
+
+def _get_territories_setup(seed: int):
+    game = Game(verbose=False, seed=seed)
+    player = game.players[game.current_player_index]
+    return (lambda: player.get_territories(game)), None
+
+
+def _bot_turn_setup(seed: int):
+    game = _bot_game(seed)
+    start = game.snapshot()
+    return game.run_bot_turn, lambda: game.restore(start)
+
+
+def _self_play_setup(seed: int):
+    games = [seed]
+
+    def op():
+        games[0] += 1
+        return play_game(seed=games[0], max_turns=500)
+
+    return op, None
+
+
+def _game_state_setup(seed: int):
+    # Imported here so the engine cases run without Flask installed
+    from app import app
+
+    client = app.test_client()
+    client.get("/api/game_state")
+
+    def op():
+        response = client.get("/api/game_state")
+        assert response.status_code == 200
+        return response
+
+    return op, None
+
+
+CASES = [
+    Case("attack", _attack_setup, samples=2000, inner=10),
+    Case("fortify", _fortify_setup, samples=2000, inner=10),
+    Case("board_are_connected", _board_are_connected_setup, samples=2000, inner=10),
+    Case("calculate_reinforcements", _reinforcements_setup, samples=2000, inner=50),
+    Case("get_territories", _get_territories_setup, samples=2000, inner=50),
+    Case("run_bot_turn", _bot_turn_setup, samples=500),
+    Case("self_play_game", _self_play_setup, samples=30),
+    Case("api_game_state", _game_state_setup, samples=1000),
+]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_case(case: Case, seed: int = 0, scale: float = 1.0, rounds: int = 3) -> CaseResult:
+    """Time ``case`` in ``rounds`` rounds and keep the one with the fastest median.
+
+    Like timeit's best-of-N, this filters out rounds slowed down by the rest
+    of the machine. Every round starts from the same seed.
+    """
+    results = [_run_round(case, seed, scale) for _ in range(rounds)]
+    return min(results, key=lambda r: r.p50_us)
+
+
+def _run_round(case: Case, seed: int, scale: float) -> CaseResult:
+    """Time ``case`` once after a short warm-up, with the garbage collector off as timeit does."""
+    op, reset = case.setup(seed)
+    samples = max(1, int(case.samples * scale))
+    for _ in range(min(samples, 10)):
+        if reset is not None:
+            reset()
+        op()
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            if reset is not None:
+                reset()
+            start = time.perf_counter()
+            for _ in range(case.inner):
+                op()
+            timings.append((time.perf_counter() - start) / case.inner)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    total = sum(timings)
+    timings.sort()
+    p50 = _percentile(timings, 0.5)
+    return CaseResult(
+        samples=samples,
+        ops_per_sec=round(samples / total, 1) if total > 0 else float("inf"),
+        median_ops_per_sec=round(1 / p50, 1) if p50 > 0 else float("inf"),
+        p50_us=round(p50 * 1e6, 2),
+        p90_us=round(_percentile(timings, 0.9) * 1e6, 2),
+        p99_us=round(_percentile(timings, 0.99) * 1e6, 2),
+    )
+
+
+def run_suite(names: Optional[List[str]] = None, seed: int = 0, scale: float = 1.0, rounds: int = 3) -> Dict:
+    cases = [c for c in CASES if not names or c.name in names]
+    unknown = set(names or ()) - {c.name for c in CASES}
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    return {
+        "meta": {
+            "seed": seed,
+            "scale": scale,
+            "rounds": rounds,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {c.name: asdict(run_case(c, seed, scale, rounds)) for c in cases},
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Cases whose median throughput fell more than ``threshold`` below the baseline.
+
+    The median is used rather than the mean so a few slow samples, e.g. from
+    another process on the machine, do not count as a regression.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        change = result["median_ops_per_sec"] / before["median_ops_per_sec"] - 1
+        if change < -threshold:
+            regressions.append({
+                "case": name,
+                "baseline_ops_per_sec": before["median_ops_per_sec"],
+                "ops_per_sec": result["median_ops_per_sec"],
+                "change": round(change, 3),
+            })
+    return regressions
+
+
+def _print_table(report: Dict, baseline: Optional[Dict]) -> None:
+    print(f"{'case':<26}{'ops/s':>12}{'p50 us':>12}{'p90 us':>12}{'p99 us':>12}{'vs base':>10}")
+    for name, r in report["results"].items():
+        change = ""
+        before = (baseline or {}).get("results", {}).get(name)
+        if before:
+            change = f"{r['median_ops_per_sec'] / before['median_ops_per_sec'] - 1:+.1%}"
+        print(f"{name:<26}{r['ops_per_sec']:>12,.0f}{r['p50_us']:>12.2f}{r['p90_us']:>12.2f}{r['p99_us']:>12.2f}{change:>10}")
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark engine hot paths, bot turns and the state API")
+    parser.add_argument("--case", action="append", default=[], help="Run only this case (repeatable)")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every case's sample count")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds per case; the fastest is reported")
+    parser.add_argument("--save", help="Write the results to this JSON file as a new baseline")
+    parser.add_argument("--baseline", help="Compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Fractional drop in median ops/sec that counts as a regression")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    if args.list:
+        for c in CASES:
+            print(c.name)
+        return
+
+    report = run_suite(args.case, seed=args.seed, scale=args.scale, rounds=args.rounds)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.threshold)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_table(report, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if report.get("regressions"):
+        if not args.json:
+            for r in report["regressions"]:
+                print(f"REGRESSION {r['case']}: {r['baseline_ops_per_sec']:,.0f} -> "
+                      f"{r['ops_per_sec']:,.0f} ops/s ({r['change']:+.1%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Vectorised dice engine for Monte Carlo battle evaluation.
+
+Simulates many independent battles at once with NumPy: every round rolls,
+sorts and compares the dice of all still-running battles as array operations.
+:meth:`DiceEngine.blitz` fights a single large battle the same way by rolling
+its three-against-two rounds in batches; :meth:`game.Game.blitz` uses it for
+sampled battles too large for the exact distribution.
+The rules match :meth:`game.Game.attack` and the conventions of
+:mod:`battle` (``attackers`` counts the armies that can be committed).
+
+Run it directly to benchmark against the per-roll ``random.randint`` path::
+
+    python dice.py --battles 200000
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+SeedLike = Union[None, int, np.random.Generator]
+
+
+class DiceEngine:
+    def __init__(self, seed: SeedLike = None):
+        # Accept an existing generator so callers can share one stream
+        self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+    def roll_round(self, attack_dice: np.ndarray, defend_dice: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Roll one round for every battle and return ``(attack_losses, defend_losses)``.
+
+        ``attack_dice`` (1-3) and ``defend_dice`` (1-2) give the number of dice
+        each side throws in each battle.
+        """
+        n = len(attack_dice)
+        attack = self.rng.integers(1, 7, size=(n, 3), dtype=np.int8)
+        defend = self.rng.integers(1, 7, size=(n, 2), dtype=np.int8)
+        # Unused dice become zeros so they sort last and never win a comparison
+        attack[np.arange(3) >= attack_dice[:, None]] = 0
+        defend[np.arange(2) >= defend_dice[:, None]] = 0
+        attack.sort(axis=1)
+        defend.sort(axis=1)
+
+        pairs = np.minimum(attack_dice, defend_dice)
+        defend_losses = (attack[:, 2] > defend[:, 1]).astype(np.int64)
+        defend_losses += (pairs == 2) & (attack[:, 1] > defend[:, 0])
+        return pairs - defend_losses, defend_losses
+
+    def simulate_battles(
+        self,
+        attackers: Union[int, np.ndarray],
+        defenders: Union[int, np.ndarray],
+        num_battles: Optional[int] = None,
+        stop: int = 0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Fight battles to the end and return the final ``(attackers, defenders)`` arrays.
+
+        Scalars are broadcast to ``num_battles`` battles; arrays describe one
+        battle per element.
+        """
+        if num_battles is None:
+            num_battles = np.broadcast(attackers, defenders).size
+        a = np.broadcast_to(np.asarray(attackers, dtype=np.int64), (num_battles,)).copy()
+        d = np.broadcast_to(np.asarray(defenders, dtype=np.int64), (num_battles,)).copy()
+
+        active = np.flatnonzero((a > stop) & (d > 0))
+        while active.size:
+            attack_losses, defend_losses = self.roll_round(np.minimum(3, a[active]), np.minimum(2, d[active]))
+            a[active] -= attack_losses
+            d[active] -= defend_losses
+            active = active[(a[active] > stop) & (d[active] > 0)]
+        return a, d
+
+    def blitz(self, attackers: int, defenders: int, stop: int = 0, batch: int = 1024) -> Tuple[int, int]:
+        """Fight one battle to the end and return the final ``(attackers, defenders)``.
+
+        While the attacker rolls three dice and the defender two, rounds do not
+        depend on each other, so up to ``batch`` of them are rolled at once and
+        cut at the first round that would not have been three against two.
+        """
+        low = max(3, stop + 1)
+        while attackers >= low and defenders >= 2:
+            # Every full round removes two armies
+            n = min(batch, (attackers - low) // 2 + 1, (defenders - 2) // 2 + 1)
+            attack_losses, defend_losses = self.roll_round(np.full(n, 3), np.full(n, 2))
+            a = attackers - np.cumsum(attack_losses)
+            d = defenders - np.cumsum(defend_losses)
+            # Rounds are played while the armies before them still allow a full round
+            over = np.flatnonzero((a < low) | (d < 2))
+            last = over[0] if over.size else n - 1
+            attackers, defenders = int(a[last]), int(d[last])
+        if attackers > stop and defenders > 0:
+            a, d = self.simulate_battles(attackers, defenders, 1, stop)
+            attackers, defenders = int(a[0]), int(d[0])
+        return attackers, defenders
+
+    def estimate_odds(self, attackers: int, defenders: int, num_battles: int = 100_000, stop: int = 0) -> Dict:
+        """Monte Carlo counterpart of :func:`battle.attack_odds`."""
+        a, d = self.simulate_battles(attackers, defenders, num_battles, stop)
+        return {
+            "attackers": attackers,
+            "defenders": defenders,
+            "stop": stop,
+            "battles": num_battles,
+            "win_probability": float(np.mean(d == 0)),
+            "expected_attackers": float(a.mean()),
+            "expected_defenders": float(d.mean()),
+        }
+
+
+def _python_battle(attackers: int, defenders: int, stop: int = 0) -> Tuple[int, int]:
+    """One battle rolled die by die, the way ``Game.attack`` does it."""
+    while attackers > stop and defenders > 0:
+        attack_rolls = sorted([random.randint(1, 6) for _ in range(min(3, attackers))], reverse=True)
+        defend_rolls = sorted([random.randint(1, 6) for _ in range(min(2, defenders))], reverse=True)
+        for a_roll, d_roll in zip(attack_rolls, defend_rolls):
+            if a_roll > d_roll:
+                defenders -= 1
+            else:
+                attackers -= 1
+    return attackers, defenders
+
+
+def benchmark(attackers: int = 10, defenders: int = 10, num_battles: int = 100_000, seed: int = 0) -> Dict:
+    random.seed(seed)
+    start = time.perf_counter()
+    wins = sum(_python_battle(attackers, defenders)[1] == 0 for _ in range(num_battles))
+    python_seconds = time.perf_counter() - start
+
+    engine = DiceEngine(seed)
+    start = time.perf_counter()
+    odds = engine.estimate_odds(attackers, defenders, num_battles)
+    numpy_seconds = time.perf_counter() - start
+
+    from battle import attack_odds
+
+    return {
+        "attackers": attackers,
+        "defenders": defenders,
+        "battles": num_battles,
+        "python_battles_per_second": round(num_battles / python_seconds),
+        "numpy_battles_per_second": round(num_battles / numpy_seconds),
+        "speedup": round(python_seconds / numpy_seconds, 1),
+        "python_win_probability": wins / num_battles,
+        "numpy_win_probability": odds["win_probability"],
+        "exact_win_probability": attack_odds(attackers, defenders).win_probability,
+    }
+
+
+def main() -> None:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Benchmark the vectorised dice engine")
+    parser.add_argument("--attackers", type=int, default=10)
+    parser.add_argument("--defenders", type=int, default=10)
+    parser.add_argument("--battles", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.attackers, args.defenders, args.battles, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Expectimax planner for chaining attacks within a turn.
+
+Plugs into :class:`game.Game` as a :class:`game.BotStrategy`. Attacks are
+blitzes, as in :meth:`game.Game.blitz`: fight until the defender is wiped out
+or the attacking territory is down to one army, then move every army but one
+into the conquered territory.
+
+The planner searches sequences of up to ``depth`` such attacks. Decision nodes
+take the best of stopping or any candidate attack. Chance nodes weight the
+exact outcome distribution from :func:`battle.attack_odds` instead of sampling
+dice. Only the most likely outcomes covering ``coverage`` of the probability
+mass are expanded (none below ``min_probability``), and lines less likely
+than ``min_path_probability`` are scored statically. Searched positions are
+kept in a bounded :class:`zobrist.TranspositionTable` under their Zobrist
+hash combined with a hash of the exact army counts, so a position reached
+again by another order of attacks is not searched again. A node budget, as well as the deadline of the
+bot turn, bounds the CPU spent per decision. Leaves are scored by :meth:`ExpectimaxBot.evaluate`,
+which rewards held continents and breaking the opponent's.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from battle import attack_odds
+from game import Game
+from zobrist import MASK, TranspositionTable
+
+Attack = Tuple[int, int]
+
+# Mixed into the position hash once the seat has conquered this turn, which
+# earns it a card and so changes the score
+CONQUERED_KEY = 0x9E37_79B9_7F4A_7C15
+
+
+@lru_cache(maxsize=65536)
+def likely_outcomes(attackers: int, defenders: int, min_probability: float, coverage: float) -> Tuple:
+    """Most likely blitz outcomes, renormalised, as ``((attackers_left, defenders_left), p)``.
+
+    Outcomes are taken in decreasing probability until ``coverage`` of the
+    mass is reached or they become less likely than ``min_probability``.
+    """
+    kept, mass = [], 0.0
+    for state, p in sorted(attack_odds(attackers, defenders).outcomes, key=lambda o: -o[1]):
+        if kept and (mass >= coverage or p < min_probability):
+            break
+        kept.append((state, p))
+        mass += p
+    return tuple((state, p / mass) for state, p in kept)
+
+
+class ExpectimaxBot:
+    def __init__(
+        self,
+        depth: int = 3,
+        deploy_depth: int = 2,
+        max_nodes: int = 20_000,
+        max_branching: int = 6,
+        max_deploy_candidates: int = 6,
+        min_attack_odds: float = 0.15,
+        min_probability: float = 0.01,
+        coverage: float = 0.95,
+        min_path_probability: float = 0.02,
+        table_size: int = 1 << 15,
+    ):
+        self.depth = depth
+        self.deploy_depth = deploy_depth
+        # Nodes expanded per decision before everything left is scored statically
+        self.max_nodes = max_nodes
+        # Candidate attacks searched per decision node, most likely to win first
+        self.max_branching = max_branching
+        self.max_deploy_candidates = max_deploy_candidates
+        self.min_attack_odds = min_attack_odds
+        self.min_probability = min_probability
+        self.coverage = coverage
+        self.min_path_probability = min_path_probability
+        # Slots of the transposition table each decision allocates for its search
+        self.table_size = table_size
+        # Weights of the static evaluation
+        self.territory_weight = 1.0
+        self.continent_weight = 1.5
+        self.army_weight = 0.25
+        self.card_weight = 2.0
+        self.exposure_weight = 0.1
+        self.last_search: Optional[Dict] = None
+
+    # BotStrategy interface
+
+    def choose_deploy(self, game: Game) -> str:
+        start = time.perf_counter()
+        search = _Search(self, game)
+        board, armies, seat = game.board, search.armies, search.seat
+        owned = game.owner_masks[seat]
+        candidates = board.indices_of(board.frontier_mask(owned) or owned)
+
+        def prospect(i: int) -> int:
+            enemies = [armies[n] for n in board.neighbors[i] if search.owners[n] != seat]
+            return armies[i] - min(enemies) if enemies else -armies[i]
+
+        candidates = sorted(candidates, key=prospect, reverse=True)[:self.max_deploy_candidates]
+        best, best_value = candidates[0], float("-inf")
+        for i in candidates:
+            search.set_armies(i, armies[i] + game.reinforcements)
+            value = search.value(self.deploy_depth, 1.0)
+            search.set_armies(i, armies[i] - game.reinforcements)
+            if value > best_value:
+                best, best_value = i, value
+        self._report("deploy", search, start, best_value)
+        return board.territories[best]
+
+    def choose_attack(self, game: Game) -> Optional[Tuple[str, str]]:
+        start = time.perf_counter()
+        search = _Search(self, game)
+        attack, value = search.best_attack(self.depth)
+        self._report("attack", search, start, value)
+        if attack is None:
+            return None
+        names = game.board.territories
+        return names[attack[0]], names[attack[1]]
+
+    def choose_fortify(self, game: Game) -> Optional[Tuple[str, str, int]]:
+        """Move the largest interior stack to the most threatened frontier territory it can reach."""
+        self.last_search = None
+        seat = game.current_player_index
+        board, armies, owners = game.board, game.army_counts, game.owners
+        frontier = board.frontier_mask(game.owner_masks[seat])
+        sources = [i for i in game.territories_by_seat[seat] if armies[i] > 1 and not frontier >> i & 1]
+        if not sources:
+            return None
+        src = max(sources, key=lambda i: armies[i])
+        labels, _ = game._seat_components(seat)
+        targets = [i for i in board.indices_of(frontier) if labels[i] == labels[src]]
+        if not targets:
+            return None
+
+        def pressure(i: int) -> int:
+            return sum(armies[n] for n in board.neighbors[i] if owners[n] != seat) - armies[i]
+
+        dst = max(targets, key=pressure)
+        return board.territories[src], board.territories[dst], armies[src] - 1
+
+    def _report(self, decision: str, search: _Search, start: float, value: float) -> None:
+        self.last_search = {
+            "decision": decision,
+            "nodes": search.nodes,
+            "memo_hits": search.memo_hits,
+            "table_used": len(search.table),
+            "seconds": round(time.perf_counter() - start, 4),
+            "value": round(value, 3),
+        }
+
+    def evaluate(self, game: Game, owners: List[int], armies: List[int], seat: int, conquered: bool) -> float:
+        """Static score of a position for ``seat`` at the end of its attacks."""
+        board = game.board
+        territories = own_armies = other_armies = 0
+        exposure = 0
+        for i, owner in enumerate(owners):
+            if owner == seat:
+                territories += 1
+                own_armies += armies[i]
+                threat = sum(armies[n] for n in board.neighbors[i] if owners[n] != seat)
+                if threat > armies[i]:
+                    exposure += threat - armies[i]
+            else:
+                other_armies += armies[i]
+        continents = 0
+        for c, name in enumerate(board.continent_names):
+            members = board.continent_members[name]
+            holder = owners[members[0]]
+            if all(owners[m] == holder for m in members):
+                # Breaking an opponent's continent is worth as much as holding one
+                continents += board.continent_bonus_values[c] if holder == seat else -board.continent_bonus_values[c]
+        return (
+            self.territory_weight * territories
+            + self.continent_weight * continents
+            + self.army_weight * (own_armies - other_armies)
+            + self.card_weight * conquered
+            - self.exposure_weight * exposure
+        )
+
+
+class _Search:
+    """One decision's search over a private copy of the territory state."""
+
+    def __init__(self, bot: ExpectimaxBot, game: Game):
+        self.bot = bot
+        self.game = game
+        self.seat = game.current_player_index
+        self.owners = list(game.owners)
+        self.armies = list(game.army_counts)
+        self.mine = game.owner_masks[self.seat]
+        self.conquered = game.players[self.seat].conquered_territory_this_turn
+        # Zobrist hash of the position being searched, kept up to date like
+        # Game's. Its army counts are bucketed, so the exact army hash is
+        # added to keep positions differing inside a bucket apart.
+        self.keys = game._zobrist
+        self.hash = game.zobrist_hash ^ (CONQUERED_KEY if self.conquered else 0)
+        self.army_hash = self.keys.army_term(self.armies)
+        # Lives only as long as this decision, so bots hold no memory between searches
+        self.table = TranspositionTable(bot.table_size)
+        self.nodes = 0
+        self.memo_hits = 0
+        # Nodes scored statically by the path probability or node budget cut-offs
+        self.cutoffs = 0
+        time_left = game.bot_time_left()
+        self.deadline = None if time_left is None else time.perf_counter() + time_left
+
+    def exhausted(self) -> bool:
+        """Whether the node budget or the bot turn's time is used up."""
+        return self.nodes >= self.bot.max_nodes or (self.deadline is not None and time.perf_counter() > self.deadline)
+
+    def set_armies(self, i: int, armies: int) -> None:
+        seat = self.owners[i]
+        self.hash ^= self.keys.key(i, seat, self.armies[i]) ^ self.keys.key(i, seat, armies)
+        self.army_hash = (self.army_hash + (armies - self.armies[i]) * self.keys.army[i]) & MASK
+        self.armies[i] = armies
+
+    def candidates(self) -> List[Tuple[float, Attack]]:
+        board, owners, armies, seat = self.game.board, self.owners, self.armies, self.seat
+        attacks = []
+        for src in board.indices_of(self.mine):
+            if armies[src] < 2:
+                continue
+            for dst in board.neighbors[src]:
+                if owners[dst] != seat:
+                    odds = attack_odds(armies[src] - 1, armies[dst]).win_probability
+                    if odds >= self.bot.min_attack_odds:
+                        attacks.append((odds, (src, dst)))
+        attacks.sort(reverse=True)
+        return attacks[:self.bot.max_branching]
+
+    def best_attack(self, depth: int) -> Tuple[Optional[Attack], float]:
+        """The attack with the highest expected value, or None if stopping is better."""
+        best, best_value = None, self.static_value()
+        for _, attack in self.candidates():
+            value = self.expected_value(attack, depth, 1.0)
+            if value > best_value:
+                best, best_value = attack, value
+        return best, best_value
+
+    def static_value(self) -> float:
+        return self.bot.evaluate(self.game, self.owners, self.armies, self.seat, self.conquered)
+
+    def value(self, depth: int, path_probability: float) -> float:
+        """Expected score of the position when attacking optimally for up to ``depth`` more attacks."""
+        if depth == 0:
+            return self.static_value()
+        if path_probability < self.bot.min_path_probability or self.exhausted():
+            self.cutoffs += 1
+            return self.static_value()
+        # An entry searched deeper is at least as good. One whose search hit a
+        # cut-off is only reused when reached with no more probability than it
+        # was, since a likelier path would have searched further.
+        key = self.hash ^ self.army_hash
+        cached = self.table.get(key, depth)
+        if cached is not None and path_probability <= cached[1]:
+            self.memo_hits += 1
+            return cached[0]
+        self.nodes += 1
+        cutoffs = self.cutoffs
+
+        best = self.static_value()
+        for _, attack in self.candidates():
+            best = max(best, self.expected_value(attack, depth, path_probability))
+        self.table.store(key, (best, path_probability if self.cutoffs != cutoffs else math.inf), depth)
+        return best
+
+    def expected_value(self, attack: Attack, depth: int, path_probability: float) -> float:
+        src, dst = attack
+        owners, armies, keys, seat = self.owners, self.armies, self.keys, self.seat
+        defender = owners[dst]
+        saved = (armies[src], armies[dst], self.mine, self.conquered, self.hash, self.army_hash)
+        army_src, army_dst = keys.army[src], keys.army[dst]
+        army_base = self.army_hash - armies[src] * army_src - armies[dst] * army_dst
+        # The position without src and dst, to which their new keys are added
+        base = self.hash ^ keys.key(src, seat, armies[src]) ^ keys.key(dst, defender, armies[dst])
+        bot = self.bot
+        total = 0.0
+        for (attackers_left, defenders_left), p in likely_outcomes(
+            armies[src] - 1, armies[dst], bot.min_probability, bot.coverage
+        ):
+            if defenders_left == 0:
+                # Conquered: everything but one army moves in
+                owners[dst] = seat
+                armies[src], armies[dst] = 1, attackers_left
+                self.mine |= 1 << dst
+                self.hash = base ^ keys.key(src, seat, 1) ^ keys.key(dst, seat, attackers_left)
+                self.army_hash = (army_base + army_src + attackers_left * army_dst) & MASK
+                if not self.conquered:
+                    self.hash ^= CONQUERED_KEY
+                    self.conquered = True
+            else:
+                armies[src], armies[dst] = 1 + attackers_left, defenders_left
+                self.hash = base ^ keys.key(src, seat, 1 + attackers_left) ^ keys.key(dst, defender, defenders_left)
+                self.army_hash = (army_base + (1 + attackers_left) * army_src + defenders_left * army_dst) & MASK
+            total += p * self.value(depth - 1, path_probability * p)
+            owners[dst] = defender
+            armies[src], armies[dst], self.mine, self.conquered, self.hash, self.army_hash = saved
+        return total
@@ -2,12 +2,19 @@
 
 from __future__ import annotations
 
+import os
 import random
+import time
+from array import array
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Literal
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Protocol, Set, Tuple
 
+from action_log import ActionLog
+from battle import MAX_SAMPLED_STATES, attack_odds
 from risk_board import Board
+from zobrist import NUM_BUCKETS, army_bucket, zobrist_keys
 
 
 class GamePhase(Enum):
@@ -18,6 +25,11 @@ class GamePhase(Enum):
     GAME_OVER = "GAME_OVER"
 
 
+NO_OWNER = -1  # Seat value of a territory that has not been dealt yet
+
+_PHASE_INDEX = {phase: n for n, phase in enumerate(GamePhase)}
+
+
 CardType = Literal["Infantry", "Cavalry", "Artillery", None]  # None represents a wildcard
 
 
@@ -48,22 +60,119 @@ class Card:
         return len(set(types)) == 1 or len(set(types)) == 3
 
 
+class BotStrategy(Protocol):
+    """Decision maker for a bot seat; ``None`` means the built-in heuristics.
+
+    Each method is called when the bot is to move in that phase and returns
+    territory names. ``last_search`` describes the most recent decision (e.g.
+    search iterations per second) and is attached to the recorded action.
+    Searching strategies keep within :meth:`Game.bot_time_left`.
+    """
+    last_search: Optional[Dict]
+
+    def choose_deploy(self, game: Game) -> str: ...
+
+    def choose_attack(self, game: Game) -> Optional[Tuple[str, str]]: ...
+
+    def choose_fortify(self, game: Game) -> Optional[Tuple[str, str, int]]: ...
+
+
+class GameRecorder(Protocol):
+    """Receives every change to a game's state, e.g. to write a replayable log.
+
+    Territories are board indices. See :class:`game_record.GameRecordWriter`.
+    """
+
+    def start(self, game: Game) -> None: ...
+
+    def deploy(self, territory: int, armies: int) -> None: ...
+
+    def attack(self, src: int, dst: int, attack_rolls: List[int], defend_rolls: List[int]) -> None: ...
+
+    def battle(self, src: int, dst: int, attack_losses: int, defend_losses: int, min_move: int) -> None: ...
+
+    def move(self, src: int, dst: int, armies: int) -> None: ...
+
+    def trade(self, card_indices: List[int]) -> None: ...
+
+    def fortify(self, src: int, dst: int, armies: int) -> None: ...
+
+    def next_phase(self) -> None: ...
+
+    def set_phase(self, phase: GamePhase) -> None: ...
+
+    def set_reinforcements(self, reinforcements: int) -> None: ...
+
+    def set_territory(self, territory: int, seat: int, armies: int) -> None: ...
+
+    def pass_turn(self) -> None: ...
+
+    def undo(self, kinds: Optional[Tuple[str, ...]]) -> None: ...
+
+    def turn_started(self, game: Game) -> None: ...
+
+    def restored(self, game: Game) -> None: ...
+
+
 @dataclass
 class Player:
     name: str
     is_bot: bool = False
     cards: List[Card] = field(default_factory=list)
     conquered_territory_this_turn: bool = False
+    strategy: Optional[BotStrategy] = None
 
     def get_territories(self, game: Game) -> List[str]:
-        return [t for t, owner in game.territory_owner.items() if owner == self]
+        names = game.board.territories
+        return [names[i] for i in game.territories_by_seat[game._seat(self)]]
+
+    def territory_count(self, game: Game) -> int:
+        return len(game.territories_by_seat[game._seat(self)])
 
     def has_territories(self, game: Game) -> bool:
-        return len(self.get_territories(game)) > 0
+        return bool(game.territories_by_seat[game._seat(self)])
+
+
+class GameRandom:
+    """Independent random streams of one game, all derived from its seed.
+
+    Setup, the deck, dice, the heuristic bot's choices and search strategies
+    each draw from their own stream, so e.g. a bot making different choices
+    does not shift the dice of a game replayed from the same seed. Streams
+    are created on first use.
+    """
+
+    STREAMS = ("setup", "deck", "dice", "bot", "search")
+
+    def __init__(self, seed: Optional[int] = None):
+        # A fresh seed from the OS rather than the global random module, whose
+        # state forked worker processes share
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), "big")
+
+    def __getattr__(self, name: str) -> random.Random:
+        if name not in GameRandom.STREAMS:
+            raise AttributeError(name)
+        # String seeds are hashed with SHA-512, so streams agree across
+        # processes and Python runs
+        stream = random.Random(f"{self.seed}/{name}")
+        setattr(self, name, stream)
+        return stream
+
+    def copy(self) -> GameRandom:
+        """Streams that continue exactly where these are."""
+        rng = GameRandom(self.seed)
+        for name in GameRandom.STREAMS:
+            stream = self.__dict__.get(name)
+            if stream is not None:
+                copied = random.Random()
+                copied.setstate(stream.getstate())
+                setattr(rng, name, copied)
+        return rng
 
 
 class Deck:
-    def __init__(self, territories: List[str]):
+    def __init__(self, territories: List[str], rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
         self.cards: List[Card] = []
         card_types: List[CardType] = ["Infantry", "Cavalry", "Artillery"]
         
@@ -78,29 +187,173 @@ class Deck:
         self.shuffle()
 
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
 
     def draw(self) -> Card | None:
         if self.cards:
             return self.cards.pop(0)
         return None
 
+    @classmethod
+    def from_cards(cls, cards: List[Card], rng: Optional[random.Random] = None) -> Deck:
+        """A deck holding exactly ``cards`` in that order, without shuffling."""
+        deck = cls.__new__(cls)
+        deck.rng = rng if rng is not None else random.Random()
+        deck.cards = list(cards)
+        return deck
+
+
+@dataclass(frozen=True, slots=True)
+class GameSnapshot:
+    """Copy of a game's mutable state, see :meth:`Game.snapshot`.
+
+    Cards are shared with the game rather than copied: they are never mutated,
+    only moved between the deck and players' hands. The random streams are
+    not captured, so restoring does not rewind the dice.
+    """
+    owners: array
+    army_counts: array
+    territory_versions: array
+    version: int
+    territory_hash: int
+    territories_by_seat: Tuple[frozenset, ...]
+    owner_masks: Tuple[int, ...]
+    continent_counts: Tuple[Tuple[int, ...], ...]
+    continent_bonus: Tuple[int, ...]
+    components: Tuple
+    # (is_bot, cards, conquered_territory_this_turn) per seat
+    players: Tuple[Tuple[bool, Tuple[Card, ...], bool], ...]
+    deck: Tuple[Card, ...]
+    current_player_index: int
+    phase: GamePhase
+    reinforcements: int
+    fortified_this_turn: bool
+    conquest_move_details: Optional[Dict]
+    card_trade_in_bonus: int
+    bot_turn_announced: bool
+    undo_stack: Tuple[Tuple, ...]
+
+
+class _OwnerView(MutableMapping):
+    """Name-keyed ``territory -> Player`` facade over ``Game.owners``."""
+
+    def __init__(self, game: Game):
+        self._game = game
+
+    def __getitem__(self, terr: str) -> Player:
+        seat = self._game.owners[self._game.board.index[terr]]
+        if seat == NO_OWNER:
+            raise KeyError(terr)
+        return self._game.players[seat]
+
+    def __setitem__(self, terr: str, player: Player) -> None:
+        game = self._game
+        i = game.board.index[terr]
+        game._set_owner(i, game._seat(player))
+        if game.recorder is not None:
+            game.recorder.set_territory(i, game.owners[i], game.army_counts[i])
+
+    def __delitem__(self, terr: str) -> None:
+        raise TypeError("Territories cannot be removed from the board")
+
+    def __iter__(self) -> Iterator[str]:
+        names = self._game.board.territories
+        return (names[i] for i, seat in enumerate(self._game.owners) if seat != NO_OWNER)
+
+    def __len__(self) -> int:
+        return len(self._game.owners) - self._game.owners.count(NO_OWNER)
+
+
+class _ArmyView(MutableMapping):
+    """Name-keyed ``territory -> armies`` facade over ``Game.army_counts``."""
+
+    def __init__(self, game: Game):
+        self._game = game
+
+    def __getitem__(self, terr: str) -> int:
+        return self._game.army_counts[self._game.board.index[terr]]
+
+    def __setitem__(self, terr: str, armies: int) -> None:
+        game = self._game
+        i = game.board.index[terr]
+        game._set_armies(i, armies)
+        if game.recorder is not None:
+            game.recorder.set_territory(i, game.owners[i], armies)
+
+    def __delitem__(self, terr: str) -> None:
+        raise TypeError("Territories cannot be removed from the board")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._game.board.territories)
+
+    def __len__(self) -> int:
+        return len(self._game.army_counts)
+
 
 class Game:
     def restart(self):
-        self.__init__()
-
-    def __init__(self) -> None:
-        self.board = Board()
-        self.territory_owner: Dict[str, Player] = {}
-        self.armies: Dict[str, int] = {}
+        last_version = self.version
+        action_log = self.bot_actions
+        recorder = self.recorder
+        strategies = [p.strategy for p in self.players]
+        self.__init__(verbose=self.verbose, board=self.board)
+        for player, strategy in zip(self.players, strategies):
+            player.strategy = strategy
+        # Same for action sequence numbers, so action cursors stay valid
+        self.bot_actions = action_log
+        # Keep versions increasing so clients holding an old one get every territory
+        self.version = last_version + 1
+        self.territory_versions = array("q", [self.version] * len(self.owners))
+        # The new game is recorded after the old one
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.start(self)
+
+    def __init__(self, verbose: bool = True, board: Optional[Board] = None, seed: Optional[int] = None) -> None:
+        # Console tracing of every move; headless simulations turn it off
+        self.verbose = verbose
+        # Every random draw comes from these streams; the same seed and the
+        # same player actions replay the same game. A fresh seed unless given.
+        self.rng = GameRandom(seed)
+        self.seed = self.rng.seed
+        # Shared, immutable topology: the classic map unless another one is
+        # given (see Board.load). Everything below is this game's own state.
+        self.board = board if board is not None else Board.load()
+        # Per-territory state indexed by ``Board.index``: owner seat (index
+        # into ``players``) and army count. The name-keyed mappings below are
+        # views over these arrays.
+        num_territories = len(self.board.territories)
+        self.owners = array("b", [NO_OWNER] * num_territories)
+        self.army_counts = array("i", [0] * num_territories)
+        # Bumped on every owner/army change; territory_versions records the
+        # version at which each territory last changed, for delta updates
+        self.version = 0
+        self.territory_versions = array("q", [0] * num_territories)
+        self.territory_owner: MutableMapping[str, Player] = _OwnerView(self)
+        self.armies: MutableMapping[str, int] = _ArmyView(self)
         self.human = Player("Human")
         self.bot = Player("Bot", is_bot=True)
         self.players = [self.human, self.bot]
+        # Zobrist hash of the (territory, owner, army bucket) triples, kept up
+        # to date by _set_owner/_set_armies; see zobrist_hash
+        self._zobrist = zobrist_keys(num_territories, len(self.players))
+        self.territory_hash = 0
         self.current_player_index = 0
-
-        all_territories = list(self.board.adjacency.keys())
-        self.deck = Deck(all_territories)
+        # Territory indices owned by each seat, kept in step with ``owners``
+        self.territories_by_seat: List[Set[int]] = [set() for _ in self.players]
+        # Bitmask of owned territory indices per seat (see Board.neighbor_masks)
+        self.owner_masks: List[int] = [0] * len(self.players)
+        # Territories held per (seat, continent) and each seat's total bonus
+        # from fully held continents
+        num_continents = len(self.board.continent_names)
+        self.continent_counts: List[List[int]] = [[0] * num_continents for _ in self.players]
+        self.continent_bonus: List[int] = [0] * len(self.players)
+        # Lazily built (labels, members) connected components per seat;
+        # None until needed again after that seat gains or loses a territory
+        self._components: List[Optional[Tuple[List[int], List[Tuple[int, ...]]]]] = [None] * len(self.players)
+
+        all_territories = list(self.board.territories)
+        self.deck = Deck(all_territories, self.rng.deck)
         self._setup(all_territories)
 
         self.phase = GamePhase.DEPLOY
@@ -108,56 +361,302 @@ class Game:
         self.fortified_this_turn = False
         self.conquest_move_details: Dict | None = None
         self.card_trade_in_bonus = 4
+        # Inverse records of the actions taken this turn, newest last (see undo)
+        self.undo_stack: List[Tuple] = []
         
-        # Queue to store bot actions for sequential display in the frontend
-        self.bot_actions = []
+        # Append-only log of bot actions, read by clients through a cursor
+        self.bot_actions = ActionLog()
+        # Set once the current bot turn has been announced in the log
+        self._bot_turn_announced = False
+        # Called with each bot action as it is recorded, e.g. to push it to a client
+        self.action_listener: Optional[Callable[[Dict], None]] = None
+        # Told about every state change, e.g. to write a replayable game record
+        self.recorder: Optional[GameRecorder] = None
+        # time.monotonic() by which the bot turn in progress must finish, if any
+        self.bot_deadline: Optional[float] = None
+
+    def snapshot(self) -> GameSnapshot:
+        """Capture the mutable game state; the board is shared, not copied."""
+        return GameSnapshot(
+            owners=self.owners[:],
+            army_counts=self.army_counts[:],
+            territory_versions=self.territory_versions[:],
+            version=self.version,
+            territory_hash=self.territory_hash,
+            territories_by_seat=tuple(map(frozenset, self.territories_by_seat)),
+            owner_masks=tuple(self.owner_masks),
+            continent_counts=tuple(map(tuple, self.continent_counts)),
+            continent_bonus=tuple(self.continent_bonus),
+            components=tuple(self._components),
+            players=tuple((p.is_bot, tuple(p.cards), p.conquered_territory_this_turn) for p in self.players),
+            deck=tuple(self.deck.cards),
+            current_player_index=self.current_player_index,
+            phase=self.phase,
+            reinforcements=self.reinforcements,
+            fortified_this_turn=self.fortified_this_turn,
+            conquest_move_details=None if self.conquest_move_details is None else dict(self.conquest_move_details),
+            card_trade_in_bonus=self.card_trade_in_bonus,
+            bot_turn_announced=self._bot_turn_announced,
+            undo_stack=tuple(self.undo_stack),
+        )
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """Return to the state captured by :meth:`snapshot`.
+
+        The snapshot can be restored any number of times. Player objects are
+        updated in place, and versions keep increasing so that clients get
+        every territory that changed since the snapshot was taken.
+        """
+        self.owners = snapshot.owners[:]
+        self.army_counts = snapshot.army_counts[:]
+        self.territory_hash = snapshot.territory_hash
+        self.territories_by_seat = [set(seats) for seats in snapshot.territories_by_seat]
+        self.owner_masks = list(snapshot.owner_masks)
+        self.continent_counts = [list(counts) for counts in snapshot.continent_counts]
+        self.continent_bonus = list(snapshot.continent_bonus)
+        # Component tuples are replaced, never mutated, so they can be shared
+        self._components = list(snapshot.components)
+        for player, (is_bot, cards, conquered) in zip(self.players, snapshot.players):
+            player.is_bot = is_bot
+            player.cards = list(cards)
+            player.conquered_territory_this_turn = conquered
+        self.deck.cards = list(snapshot.deck)
+        self.current_player_index = snapshot.current_player_index
+        self.phase = snapshot.phase
+        self.reinforcements = snapshot.reinforcements
+        self.fortified_this_turn = snapshot.fortified_this_turn
+        self.conquest_move_details = (
+            None if snapshot.conquest_move_details is None else dict(snapshot.conquest_move_details)
+        )
+        self.card_trade_in_bonus = snapshot.card_trade_in_bonus
+        self._bot_turn_announced = snapshot.bot_turn_announced
+        self.undo_stack = list(snapshot.undo_stack)
+
+        if self.version <= snapshot.version:
+            self.version = snapshot.version
+            self.territory_versions = snapshot.territory_versions[:]
+        else:
+            # Territories touched after the snapshot changed back, so they
+            # get a new version rather than their old one
+            self.version += 1
+            versions = snapshot.territory_versions[:]
+            for i, v in enumerate(self.territory_versions):
+                if v > snapshot.version:
+                    versions[i] = self.version
+            self.territory_versions = versions
+        if self.recorder is not None:
+            self.recorder.restored(self)
+
+    def clone(self, verbose: bool = False, seed: Optional[int] = None) -> Game:
+        """An independent copy sharing this game's board, e.g. for search.
+
+        The copy starts with an empty action log and no action listener. Its
+        random streams continue this game's, so it rolls the same dice,
+        unless ``seed`` gives it new ones.
+        """
+        game = Game.__new__(Game)
+        game.verbose = verbose
+        game.rng = self.rng.copy() if seed is None else GameRandom(seed)
+        game.seed = game.rng.seed
+        game.board = self.board
+        game._zobrist = self._zobrist
+        game.territory_owner = _OwnerView(game)
+        game.armies = _ArmyView(game)
+        game.players = [Player(p.name, p.is_bot) for p in self.players]
+        game.human, game.bot = game.players[0], game.players[1]
+        game.deck = Deck.from_cards([], game.rng.deck)
+        game.version = 0
+        game.bot_actions = ActionLog()
+        game.action_listener = None
+        game.recorder = None
+        game.bot_deadline = None
+        game.restore(self.snapshot())
+        return game
+
+    def _record_bot_action(self, action: Dict) -> Optional[int]:
+        seq = self.bot_actions.append(action)
+        if self.action_listener is not None:
+            self.action_listener(action)
+        return seq
+
+    def _log(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
+    def _seat(self, player: Player) -> int:
+        for seat, p in enumerate(self.players):
+            if p is player:
+                return seat
+        return NO_OWNER
+
+    def _owner_seat(self, terr: str) -> int:
+        i = self.board.index.get(terr)
+        return NO_OWNER if i is None else self.owners[i]
+
+    def _set_owner(self, i: int, seat: int) -> None:
+        old = self.owners[i]
+        if old == seat:
+            return
+        board = self.board
+        c = board.continent_of[i]
+        size, bonus = board.continent_sizes[c], board.continent_bonus_values[c]
+        keys, base = self._zobrist.territory, i * len(self.players)
+        bucket = army_bucket(self.army_counts[i])
+        if old != NO_OWNER:
+            self.territory_hash ^= keys[(base + old) * NUM_BUCKETS + bucket]
+            self._components[old] = None
+            self.territories_by_seat[old].discard(i)
+            self.owner_masks[old] &= ~(1 << i)
+            if self.continent_counts[old][c] == size:
+                self.continent_bonus[old] -= bonus
+            self.continent_counts[old][c] -= 1
+        self.territory_hash ^= keys[(base + seat) * NUM_BUCKETS + bucket]
+        self._components[seat] = None
+        self.territories_by_seat[seat].add(i)
+        self.owner_masks[seat] |= 1 << i
+        self.continent_counts[seat][c] += 1
+        if self.continent_counts[seat][c] == size:
+            self.continent_bonus[seat] += bonus
+        self.owners[i] = seat
+        self.version += 1
+        self.territory_versions[i] = self.version
+
+    def _set_armies(self, i: int, armies: int) -> None:
+        old = self.army_counts[i]
+        if old == armies:
+            return
+        seat = self.owners[i]
+        if seat != NO_OWNER:
+            old_bucket, new_bucket = army_bucket(old), army_bucket(armies)
+            if old_bucket != new_bucket:
+                keys, base = self._zobrist.territory, (i * len(self.players) + seat) * NUM_BUCKETS
+                self.territory_hash ^= keys[base + old_bucket] ^ keys[base + new_bucket]
+        self.army_counts[i] = armies
+        self.version += 1
+        self.territory_versions[i] = self.version
+
+    @property
+    def zobrist_hash(self) -> int:
+        """64-bit hash of the position: territories, phase and player to move."""
+        keys = self._zobrist
+        return self.territory_hash ^ keys.phase[_PHASE_INDEX[self.phase]] ^ keys.player[self.current_player_index]
+
+    def _compute_territory_hash(self) -> int:
+        """Recompute ``territory_hash`` from scratch, e.g. to check the incremental one."""
+        h = 0
+        for i, (seat, armies) in enumerate(zip(self.owners, self.army_counts)):
+            if seat != NO_OWNER:
+                h ^= self._zobrist.key(i, seat, armies)
+        return h
+
+    def changed_since(self, version: int) -> List[int]:
+        """Indices of territories whose owner or armies changed after ``version``."""
+        return [i for i, v in enumerate(self.territory_versions) if v > version]
 
     def _setup(self, territories: List[str]) -> None:
-        random.shuffle(territories)
+        self.rng.setup.shuffle(territories)
+        index = self.board.index
         for i, terr in enumerate(territories):
-            player = self.players[i % len(self.players)]
-            self.territory_owner[terr] = player
-            self.armies[terr] = 1
+            self._set_owner(index[terr], i % len(self.players))
+            self._set_armies(index[terr], 1)
 
     def _calculate_reinforcements(self, player: Player) -> int:
-        num_territories = len(player.get_territories(self))
-        base = max(3, num_territories // 3)
-        for continent, territories in self.board.continents.items():
-            if all(self.territory_owner.get(t) == player for t in territories):
-                base += self.board.continent_bonuses[continent]
-        return base
+        seat = self._seat(player)
+        return max(3, len(self.territories_by_seat[seat]) // 3) + self.continent_bonus[seat]
+
+    def _seat_components(self, seat: int) -> Tuple[List[int], List[Tuple[int, ...]]]:
+        components = self._components[seat]
+        if components is None:
+            components = self.board.connected_components(self.territories_by_seat[seat])
+            self._components[seat] = components
+        return components
+
+    def are_connected(self, player: Player, from_terr: str, to_terr: str) -> bool:
+        """Whether the player can move armies between the two territories."""
+        seat = self._seat(player)
+        if self._owner_seat(from_terr) != seat or self._owner_seat(to_terr) != seat:
+            return False
+        labels, _ = self._seat_components(seat)
+        return labels[self.board.index[from_terr]] == labels[self.board.index[to_terr]]
+
+    def reachable_territories(self, player: Player, terr: str) -> List[str]:
+        """All territories connected to ``terr`` through the player's own territories."""
+        seat = self._seat(player)
+        if self._owner_seat(terr) != seat:
+            return []
+        labels, components = self._seat_components(seat)
+        names = self.board.territories
+        return [names[i] for i in components[labels[self.board.index[terr]]]]
+
+    def controls_continent(self, player: Player, continent: str) -> bool:
+        c = self.board.continent_index[continent]
+        return self.continent_counts[self._seat(player)][c] == self.board.continent_sizes[c]
+
+    def controlled_continents(self, player: Player) -> List[str]:
+        counts = self.continent_counts[self._seat(player)]
+        board = self.board
+        return [name for c, name in enumerate(board.continent_names) if counts[c] == board.continent_sizes[c]]
 
     def deploy(self, player: Player, terr: str, num_armies: int) -> bool:
         current_player = self.players[self.current_player_index]
         if player != current_player or self.phase != GamePhase.DEPLOY:
             return False
-        if self.territory_owner.get(terr) != player or num_armies > self.reinforcements:
+        if self._owner_seat(terr) != self.current_player_index or num_armies > self.reinforcements:
             return False
 
-        self.armies[terr] += num_armies
+        i = self.board.index[terr]
+        self._set_armies(i, self.army_counts[i] + num_armies)
         self.reinforcements -= num_armies
+        self.undo_stack.append(("deploy", i, num_armies))
+        if self.recorder is not None:
+            self.recorder.deploy(i, num_armies)
         return True
 
-    def attack(self, attacker: Player, from_terr: str, to_terr: str, num_attack_armies: int) -> Dict:
+    def _attack_error(self, attacker: Player, from_terr: str, to_terr: str) -> Optional[str]:
         current_player = self.players[self.current_player_index]
         if attacker != current_player or self.phase != GamePhase.ATTACK:
-            return {"success": False, "error": "Not in attack phase or not your turn."}
-        if self.territory_owner.get(from_terr) != attacker or self.territory_owner.get(to_terr) == attacker:
-            return {"success": False, "error": "Invalid attack."}
-        if to_terr not in self.board.adjacency[from_terr]:
-            return {"success": False, "error": "Territories not adjacent."}
-
-        from_terr_armies = self.armies[from_terr]
-        if from_terr_armies <= num_attack_armies:
+            return "Not in attack phase or not your turn."
+        seat = self.current_player_index
+        if self._owner_seat(from_terr) != seat or self._owner_seat(to_terr) in (seat, NO_OWNER):
+            return "Invalid attack."
+        if self.board.index[to_terr] not in self.board.neighbors[self.board.index[from_terr]]:
+            return "Territories not adjacent."
+        return None
+
+    def attack(self, attacker: Player, from_terr: str, to_terr: str, num_attack_armies: int,
+               rolls: Optional[Tuple[List[int], List[int]]] = None) -> Dict:
+        """Roll one round of dice.
+
+        ``rolls`` supplies the ``(attack, defend)`` dice instead of rolling
+        them, e.g. to replay a recorded outcome.
+        """
+        error = self._attack_error(attacker, from_terr, to_terr)
+        if error:
+            return {"success": False, "error": error}
+
+        src, dst = self.board.index[from_terr], self.board.index[to_terr]
+        armies = self.army_counts
+        if armies[src] <= num_attack_armies:
             return {"success": False, "error": "Not enough armies to attack."}
         if not (1 <= num_attack_armies <= 3):
             return {"success": False, "error": "Can only attack with 1, 2, or 3 armies."}
 
-        defender = self.territory_owner[to_terr]
-        num_defend_armies = min(2, self.armies[to_terr])
+        num_defend_armies = min(2, armies[dst])
 
-        attack_rolls = sorted([random.randint(1, 6) for _ in range(num_attack_armies)], reverse=True)
-        defend_rolls = sorted([random.randint(1, 6) for _ in range(num_defend_armies)], reverse=True)
+        if rolls is None:
+            dice = self.rng.dice
+            attack_rolls = sorted([dice.randint(1, 6) for _ in range(num_attack_armies)], reverse=True)
+            defend_rolls = sorted([dice.randint(1, 6) for _ in range(num_defend_armies)], reverse=True)
+        else:
+            attack_rolls, defend_rolls = list(rolls[0]), list(rolls[1])
+            if len(attack_rolls) != num_attack_armies or len(defend_rolls) != num_defend_armies:
+                return {"success": False, "error": "Wrong number of dice."}
+            if not all(isinstance(die, int) and 1 <= die <= 6 for die in attack_rolls + defend_rolls):
+                return {"success": False, "error": "Dice must be between 1 and 6."}
+            attack_rolls.sort(reverse=True)
+            defend_rolls.sort(reverse=True)
+        if self.recorder is not None:
+            self.recorder.attack(src, dst, attack_rolls, defend_rolls)
 
         attack_losses, defend_losses = 0, 0
         for a_roll, d_roll in zip(attack_rolls, defend_rolls):
@@ -166,29 +665,112 @@ class Game:
             else:
                 attack_losses += 1
 
-        self.armies[from_terr] -= attack_losses
-        self.armies[to_terr] -= defend_losses
-
-        conquered = self.armies[to_terr] <= 0
+        conquered = self._apply_battle_losses(src, dst, attack_losses, defend_losses, num_attack_armies)
         result = {
             "success": True, "conquered": conquered, "attack_rolls": attack_rolls,
             "defend_rolls": defend_rolls, "attack_losses": attack_losses, "defend_losses": defend_losses
         }
-
         if conquered:
-            self.territory_owner[to_terr] = attacker
-            self.armies[to_terr] = 0
-            attacker.conquered_territory_this_turn = True
-            self.phase = GamePhase.ATTACK_MOVE
-            self.conquest_move_details = {
-                "from_terr": from_terr, "to_terr": to_terr,
-                "min_move": num_attack_armies, "max_move": self.armies[from_terr] - 1
-            }
             result["conquest_move_details"] = self.conquest_move_details
-            self._check_game_over()
-
         return result
 
+    def _apply_battle_losses(self, src: int, dst: int, attack_losses: int, defend_losses: int, min_move: int) -> bool:
+        """Remove casualties and, if the defender is wiped out, take the territory."""
+        armies = self.army_counts
+        self.undo_stack.append((
+            "battle", src, dst, armies[src], armies[dst], self.owners[dst], self.phase,
+            self.conquest_move_details, self.players[self.current_player_index].conquered_territory_this_turn,
+        ))
+        self._set_armies(src, armies[src] - attack_losses)
+        self._set_armies(dst, armies[dst] - defend_losses)
+        if armies[dst] > 0:
+            return False
+
+        attacker = self.players[self.current_player_index]
+        self._set_owner(dst, self.current_player_index)
+        self._set_armies(dst, 0)
+        attacker.conquered_territory_this_turn = True
+        self.phase = GamePhase.ATTACK_MOVE
+        names = self.board.territories
+        self.conquest_move_details = {
+            "from_terr": names[src], "to_terr": names[dst],
+            "min_move": min_move, "max_move": armies[src] - 1
+        }
+        self._check_game_over()
+        return True
+
+    def _sample_battle(self, attackers: int, defenders: int, stop: int) -> Optional[Tuple[int, int]]:
+        """Final ``(attackers, defenders)`` of a whole battle, or None to roll it round by round."""
+        if attackers * defenders <= MAX_SAMPLED_STATES:
+            outcomes = attack_odds(attackers, defenders, stop).outcomes
+            r = self.rng.dice.random()
+            for state, p in outcomes:
+                r -= p
+                if r < 0:
+                    break
+            return state
+        try:
+            # NumPy is only needed for battles this large
+            from dice import DiceEngine
+        except ImportError:
+            return None
+        return DiceEngine(self.rng.dice.getrandbits(64)).blitz(attackers, defenders, stop)
+
+    def blitz(self, attacker: Player, from_terr: str, to_terr: str, stop_at: int = 1,
+              max_rounds: Optional[int] = None, sample: bool = False) -> Dict:
+        """Keep attacking until conquest, until ``from_terr`` is down to
+        ``stop_at`` armies, or until ``max_rounds`` dice rounds have been rolled.
+
+        With ``sample`` (and no round limit) the final outcome is drawn directly
+        from the exact battle distribution instead of rolling every round, or
+        for battles too large for that, rolled in vectorised batches.
+        """
+        error = self._attack_error(attacker, from_terr, to_terr)
+        if error:
+            return {"success": False, "error": error}
+        if stop_at < 1:
+            return {"success": False, "error": "Must keep at least one army behind."}
+
+        src, dst = self.board.index[from_terr], self.board.index[to_terr]
+        armies = self.army_counts
+        if armies[src] <= max(1, stop_at):
+            return {"success": False, "error": "Not enough armies to attack."}
+
+        committed, defenders = armies[src] - 1, armies[dst]
+        sampled = self._sample_battle(committed, defenders, stop_at - 1) if sample and max_rounds is None else None
+        if sampled is not None:
+            attackers_left, defenders_left = sampled
+            attack_losses = committed - attackers_left
+            defend_losses = defenders - defenders_left
+            if self.recorder is not None:
+                self.recorder.battle(src, dst, attack_losses, defend_losses, min(3, attackers_left))
+            conquered = self._apply_battle_losses(src, dst, attack_losses, defend_losses, min(3, attackers_left))
+            result = {
+                "success": True, "conquered": conquered, "rounds": None,
+                "attack_losses": attack_losses, "defend_losses": defend_losses
+            }
+            if conquered:
+                result["conquest_move_details"] = self.conquest_move_details
+            return result
+
+        rounds = attack_losses = defend_losses = 0
+        result: Dict = {"conquered": False}
+        while armies[src] > stop_at and (max_rounds is None or rounds < max_rounds):
+            result = self.attack(attacker, from_terr, to_terr, min(3, armies[src] - 1))
+            rounds += 1
+            attack_losses += result["attack_losses"]
+            defend_losses += result["defend_losses"]
+            if result["conquered"]:
+                break
+
+        summary = {
+            "success": True, "conquered": result["conquered"], "rounds": rounds,
+            "attack_losses": attack_losses, "defend_losses": defend_losses
+        }
+        if result["conquered"]:
+            summary["conquest_move_details"] = self.conquest_move_details
+        return summary
+
     def move_after_conquest(self, player: Player, num_move_armies: int) -> Dict:
         if player != self.players[self.current_player_index] or self.phase != GamePhase.ATTACK_MOVE:
             return {"success": False, "error": "Not in correct phase."}
@@ -200,8 +782,12 @@ class Game:
         if not (details["min_move"] <= num_move_armies <= details["max_move"]):
             return {"success": False, "error": f"Invalid army number."}
 
-        self.armies[details["from_terr"]] -= num_move_armies
-        self.armies[details["to_terr"]] = num_move_armies
+        src, dst = self.board.index[details["from_terr"]], self.board.index[details["to_terr"]]
+        self._set_armies(src, self.army_counts[src] - num_move_armies)
+        self._set_armies(dst, num_move_armies)
+        self.undo_stack.append(("move", src, dst, num_move_armies, details))
+        if self.recorder is not None:
+            self.recorder.move(src, dst, num_move_armies)
 
         self.phase = GamePhase.ATTACK
         self.conquest_move_details = None
@@ -213,10 +799,9 @@ class Game:
         if len(card_indices) != 3:
             return {"success": False, "error": "Must select 3 cards."}
 
-        try:
-            cards_to_trade = [player.cards[i] for i in card_indices]
-        except IndexError:
+        if len(set(card_indices)) != 3 or not all(0 <= i < len(player.cards) for i in card_indices):
             return {"success": False, "error": "Invalid card selection."}
+        cards_to_trade = [player.cards[i] for i in card_indices]
 
         # Use improved card set validation
         is_set = Card.is_valid_set(cards_to_trade)
@@ -224,6 +809,13 @@ class Game:
         if not is_set:
             return {"success": False, "error": "Not a valid set (need three of a kind, one of each kind, or sets with wildcards)."}
 
+        if self.recorder is not None:
+            self.recorder.trade(card_indices)
+        self.undo_stack.append((
+            "trade", self.current_player_index, tuple(sorted(zip(card_indices, cards_to_trade), key=lambda pair: pair[0])),
+            self.card_trade_in_bonus,
+        ))
+
         # Calculate bonus troops
         current_bonus = self.card_trade_in_bonus
         self.reinforcements += current_bonus
@@ -246,78 +838,99 @@ class Game:
         current_player = self.players[self.current_player_index]
         if player != current_player or self.phase != GamePhase.FORTIFY or self.fortified_this_turn:
             return False
-        if self.territory_owner.get(from_terr) != player or self.territory_owner.get(to_terr) != player:
+        seat = self.current_player_index
+        if self._owner_seat(from_terr) != seat or self._owner_seat(to_terr) != seat:
             return False
-        if self.armies[from_terr] <= num_armies:
+        src, dst = self.board.index[from_terr], self.board.index[to_terr]
+        if self.army_counts[src] <= num_armies:
             return False
-        if not self.board.are_connected(from_terr, to_terr, player, self.territory_owner):
+        labels, _ = self._seat_components(seat)
+        if labels[src] != labels[dst]:
             return False
 
-        self.armies[from_terr] -= num_armies
-        self.armies[to_terr] += num_armies
+        self._set_armies(src, self.army_counts[src] - num_armies)
+        self._set_armies(dst, self.army_counts[dst] + num_armies)
         self.fortified_this_turn = True
+        self.undo_stack.append(("fortify", src, dst, num_armies))
+        if self.recorder is not None:
+            self.recorder.fortify(src, dst, num_armies)
         return True
 
-    def _check_game_over(self):
-        if not self.bot.has_territories(self) or not self.human.has_territories(self):
-            self.phase = GamePhase.GAME_OVER
+    def undo(self, kinds: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+        """Take back the most recent action and return its kind, or None.
+
+        Kinds are "deploy", "battle", "move", "trade", "fortify" and "phase"
+        (a phase change within the turn). With ``kinds``, only an action of
+        one of those kinds is taken back, along with any phase changes made
+        after it. Turns cannot be undone once they have ended.
+        """
+        if self.recorder is not None:
+            self.recorder.undo(kinds)
+        stack = self.undo_stack
+        target = len(stack) - 1
+        if kinds is not None:
+            while target >= 0 and stack[target][0] == "phase":
+                target -= 1
+            if target < 0 or stack[target][0] not in kinds:
+                return None
+        kind = None
+        while len(stack) > target and stack:
+            kind = self._unmake(stack.pop())
+        return kind
+
+    def _unmake(self, record: Tuple) -> str:
+        kind = record[0]
+        armies = self.army_counts
+        if kind == "deploy":
+            _, i, n = record
+            self._set_armies(i, armies[i] - n)
+            self.reinforcements += n
+        elif kind == "battle":
+            _, src, dst, src_armies, dst_armies, dst_owner, phase, details, conquered = record
+            self._set_owner(dst, dst_owner)
+            self._set_armies(src, src_armies)
+            self._set_armies(dst, dst_armies)
+            self.phase = phase
+            self.conquest_move_details = details
+            self.players[self.current_player_index].conquered_territory_this_turn = conquered
+        elif kind == "move":
+            _, src, dst, n, details = record
+            self._set_armies(src, armies[src] + n)
+            self._set_armies(dst, 0)
+            self.phase = GamePhase.ATTACK_MOVE
+            self.conquest_move_details = details
+        elif kind == "trade":
+            _, seat, traded, bonus = record
+            cards = self.players[seat].cards
+            for i, card in traded:
+                cards.insert(i, card)
+            self.reinforcements -= bonus
+            self.card_trade_in_bonus = bonus
+        elif kind == "fortify":
+            _, src, dst, n = record
+            self._set_armies(src, armies[src] + n)
+            self._set_armies(dst, armies[dst] - n)
+            self.fortified_this_turn = False
+        elif kind == "phase":
+            self.phase = record[1]
+        return kind
 
-    def run_bot_turn(self):
-        print(f"Bot turn triggered! Current player: {self.players[self.current_player_index].name}, Phase: {self.phase}")
-        
-        # Clear previous bot actions
-        self.bot_actions = []
-        
-        # Check if it's actually the bot's turn
-        if self.players[self.current_player_index] != self.bot:
-            print(f"ERROR: Not the bot's turn! Current player is {self.players[self.current_player_index].name}")
-            return
-            
-        if self.phase == GamePhase.GAME_OVER:
-            print("Game is over, bot turn skipped")
-            return
-            
-        if self.phase != GamePhase.DEPLOY:
-            print(f"ERROR: Bot turn called but phase is {self.phase} instead of DEPLOY")
-            self.phase = GamePhase.DEPLOY  # Force correct phase
-            
-        # Check if bot has territories
-        if not self.bot.has_territories(self):
-            print("Bot has no territories, ending game")
+    def _check_game_over(self):
+        if sum(1 for owned in self.territories_by_seat if owned) <= 1:
             self.phase = GamePhase.GAME_OVER
-            return
-        
-        # Start with a bot turn message
-        self.bot_actions.append({
-            "type": "turn_start",
-            "message": "Bot begins turn"
-        })
-        
-        print(f"Bot starting DEPLOY phase with {self.reinforcements} reinforcements")
-        self._bot_deploy()
-        
-        print("Bot starting ATTACK phase")
-        self.phase = GamePhase.ATTACK
-        self._bot_attack()
-        
-        print("Bot starting FORTIFY phase")
-        self.phase = GamePhase.FORTIFY
-        self._bot_fortify()
-        
-        print("Bot ending turn")
-        self.next_phase()
 
     def _bot_deploy(self):
+        bot = self.players[self.current_player_index]
         # Check for card trade-ins first
-        if len(self.bot.cards) >= 5:
+        if len(bot.cards) >= 5:
             from itertools import combinations
-            for indices in combinations(range(len(self.bot.cards)), 3):
-                cards = [self.bot.cards[i] for i in indices]
+            for indices in combinations(range(len(bot.cards)), 3):
+                cards = [bot.cards[i] for i in indices]
                 if len({c.card_type for c in cards}) in [1, 3]:
                     card_names = [f"{c.territory} ({c.card_type})" for c in cards]
-                    result = self.trade_in_cards(self.bot, list(indices))
+                    result = self.trade_in_cards(bot, list(indices))
                     if result.get("success"):
-                        self.bot_actions.append({
+                        self._record_bot_action({
                             "type": "trade_in",
                             "cards": card_names,
                             "bonus": result.get("bonus"),
@@ -326,153 +939,211 @@ class Game:
                     break
 
         # Calculate reinforcements and prepare for deployment
-        self.reinforcements = self._calculate_reinforcements(self.bot)
-        bot_territories = self.bot.get_territories(self)
-        frontier = [t for t in bot_territories if self._is_frontier(t)]
+        self.reinforcements = self._calculate_reinforcements(bot)
+        if self.recorder is not None:
+            self.recorder.set_reinforcements(self.reinforcements)
+        bot_territories = bot.get_territories(self)
+        frontier = self.frontier_territories(bot)
         
         # Record reinforcement calculation
-        self.bot_actions.append({
+        self._record_bot_action({
             "type": "reinforcement",
             "amount": self.reinforcements,
             "message": f"Bot received {self.reinforcements} reinforcements"
         })
 
         # Choose deployment territory
-        if not frontier:
-            if bot_territories:
-                deploy_to = random.choice(bot_territories)
-                self.deploy(self.bot, deploy_to, self.reinforcements)
-                self.bot_actions.append({
-                    "type": "deploy",
-                    "territory": deploy_to,
-                    "armies": self.reinforcements,
-                    "message": f"Bot deployed {self.reinforcements} armies to {deploy_to}"
-                })
+        if bot.strategy is not None:
+            deploy_to = bot.strategy.choose_deploy(self)
+        elif frontier:
+            # Deploy to strongest frontier territory
+            deploy_to = max(frontier, key=lambda t: self.armies[t])
+        elif bot_territories:
+            deploy_to = self.rng.bot.choice(bot_territories)
+        else:
             return
 
-        # Deploy to strongest frontier territory
-        deploy_to = max(frontier, key=lambda t: self.armies[t])
-        self.deploy(self.bot, deploy_to, self.reinforcements)
-        self.bot_actions.append({
+        amount = self.reinforcements
+        self.deploy(bot, deploy_to, amount)
+        self._record_bot_action(self._with_search_stats(bot, {
             "type": "deploy",
             "territory": deploy_to,
-            "armies": self.reinforcements,
-            "message": f"Bot deployed {self.reinforcements} armies to {deploy_to}"
-        })
-
-    def _bot_attack(self):
-        print("BOT ATTACK: --- Starting bot attack sequence ---")
-        self.bot_actions.append({
+            "armies": amount,
+            "message": f"Bot deployed {amount} armies to {deploy_to}"
+        }))
+
+    def _with_search_stats(self, bot: Player, action: Dict) -> Dict:
+        """Attach the strategy's report on the decision behind ``action``."""
+        if bot.strategy is not None and bot.strategy.last_search is not None:
+            action["search"] = bot.strategy.last_search
+            self._log(f"Bot search: {bot.strategy.last_search}")
+        return action
+
+    def _bot_attack(self, should_stop: Optional[Callable[[], bool]] = None):
+        bot = self.players[self.current_player_index]
+        self._log("BOT ATTACK: --- Starting bot attack sequence ---")
+        self._record_bot_action({
             "type": "phase_change",
             "phase": "ATTACK",
             "message": "Bot begins attack phase"
         })
 
-        max_attacks = 15  # Safety limit for number of attack loops
+        # Safety limit for number of attack loops; a strategy blitzes, so each
+        # of its attacks either conquers or exhausts the attacking territory
+        max_attacks = 15 if bot.strategy is None else 2 * len(self.board.territories)
         for i in range(max_attacks):
-            print(f"\nBOT ATTACK: Loop {i + 1}/{max_attacks}. Current phase: {self.phase}")
+            self._log(f"\nBOT ATTACK: Loop {i + 1}/{max_attacks}. Current phase: {self.phase}")
 
             if self.phase in [GamePhase.GAME_OVER, GamePhase.FORTIFY]:
-                print(f"BOT ATTACK: Phase is now {self.phase}. Ending attack sequence.")
+                self._log(f"BOT ATTACK: Phase is now {self.phase}. Ending attack sequence.")
                 break
 
             if self.phase == GamePhase.ATTACK_MOVE:
-                print("BOT ATTACK: Handling mandatory move after conquest.")
+                self._log("BOT ATTACK: Handling mandatory move after conquest.")
                 if self.conquest_move_details:
                     details = self.conquest_move_details
                     try:
                         # Bot will move all but one army from the attacking territory
                         armies_to_move = self.armies[details["from_terr"]] - 1
                         if armies_to_move > 0:
-                            print(f"BOT ATTACK: Moving {armies_to_move} armies to new territory.")
-                            self.move_after_conquest(self.bot, armies_to_move)
+                            self._log(f"BOT ATTACK: Moving {armies_to_move} armies to new territory.")
+                            self.move_after_conquest(bot, armies_to_move)
                         else:
                             # This case should ideally not happen if an attack was successful
-                            print("BOT ATTACK: No armies to move. Switching back to ATTACK.")
-                            self.phase = GamePhase.ATTACK
+                            self._log("BOT ATTACK: No armies to move. Switching back to ATTACK.")
+                            self._set_phase(GamePhase.ATTACK)
                     except Exception as e:
-                        print(f"BOT ATTACK: Error during move_after_conquest: {e}. Forcing FORTIFY.")
-                        self.phase = GamePhase.FORTIFY
+                        self._log(f"BOT ATTACK: Error during move_after_conquest: {e}. Forcing FORTIFY.")
+                        self._set_phase(GamePhase.FORTIFY)
                 else:
-                    print("BOT ATTACK: ERROR - In ATTACK_MOVE with no details. Forcing FORTIFY.")
-                    self.phase = GamePhase.FORTIFY
+                    self._log("BOT ATTACK: ERROR - In ATTACK_MOVE with no details. Forcing FORTIFY.")
+                    self._set_phase(GamePhase.FORTIFY)
                 continue # Restart loop to re-evaluate the game state
 
             if self.phase != GamePhase.ATTACK:
-                print(f"BOT ATTACK: Phase is {self.phase}, not ATTACK. Exiting.")
+                self._log(f"BOT ATTACK: Phase is {self.phase}, not ATTACK. Exiting.")
+                break
+
+            if should_stop is not None and should_stop():
+                self._log("BOT ATTACK: Asked to stop. Ending attack sequence.")
+                self._record_bot_action({
+                    "type": "attack_stopped",
+                    "message": "Bot ran out of time and stops attacking"
+                })
                 break
 
-            # Find all possible attacks the bot can make
-            attacks = []
-            bot_territories = self.bot.get_territories(self)
-            for t in bot_territories:
-                if self.armies.get(t, 0) > 1:  # Territory must have more than 1 army to attack
-                    for n in self.board.adjacency.get(t, []):
-                        if self.territory_owner.get(n) == self.human:
-                            # Simple logic: attack if the bot has more armies
-                            if self.armies[t] > self.armies.get(n, 0):
-                                attacks.append((t, n))
+            if bot.strategy is not None:
+                choice = bot.strategy.choose_attack(self)
+                if choice is None:
+                    self._log("BOT ATTACK: Strategy stops attacking. Moving to FORTIFY.")
+                    self._set_phase(GamePhase.FORTIFY)
+                    break
+                from_terr, to_terr = choice
+                self._log(f"BOT ATTACK: Blitzing {to_terr} from {from_terr}.")
+                result = self.blitz(bot, from_terr, to_terr)
+            else:
+                # Find all possible attacks the bot can make
+                attacks = []
+                seat = self.current_player_index
+                owners, armies = self.owners, self.army_counts
+                for t in self.territories_by_seat[seat]:
+                    if armies[t] > 1:  # Territory must have more than 1 army to attack
+                        for n in self.board.neighbors[t]:
+                            if owners[n] != seat:
+                                # Simple logic: attack if the bot has more armies
+                                if armies[t] > armies[n]:
+                                    attacks.append((t, n))
             
-            if not attacks:
-                print("BOT ATTACK: No more viable attacks. Moving to FORTIFY.")
-                self.phase = GamePhase.FORTIFY
-                break # Exit the attack loop
-
-            # Bot chooses the best attack (from its strongest territory)
-            from_terr, to_terr = max(attacks, key=lambda att: self.armies[att[0]])
-            num_attackers = min(3, self.armies[from_terr] - 1)
+                if not attacks:
+                    self._log("BOT ATTACK: No more viable attacks. Moving to FORTIFY.")
+                    self._set_phase(GamePhase.FORTIFY)
+                    break # Exit the attack loop
+
+                # Bot chooses the best attack (from its strongest territory)
+                src, dst = max(attacks, key=lambda att: armies[att[0]])
+                from_terr, to_terr = self.board.territories[src], self.board.territories[dst]
+                num_attackers = min(3, armies[src] - 1)
             
-            if num_attackers <= 0:
-                print(f"BOT ATTACK: Logic error, num_attackers is {num_attackers}. Skipping attack.")
-                continue
-
-            print(f"BOT ATTACK: Attacking {to_terr} from {from_terr} with {num_attackers} armies.")
-            # The self.attack() method will handle dice rolls, army updates, and phase changes
-            self.attack(self.bot, from_terr, to_terr, num_attackers)
+                if num_attackers <= 0:
+                    self._log(f"BOT ATTACK: Logic error, num_attackers is {num_attackers}. Skipping attack.")
+                    continue
+
+                self._log(f"BOT ATTACK: Attacking {to_terr} from {from_terr} with {num_attackers} armies.")
+                # The self.attack() method will handle dice rolls, army updates, and phase changes
+                result = self.attack(bot, from_terr, to_terr, num_attackers)
+
+            if result.get("success"):
+                outcome = "and conquered it" if result["conquered"] else f"losing {result['attack_losses']} and killing {result['defend_losses']}"
+                self._record_bot_action(self._with_search_stats(bot, {
+                    "type": "attack",
+                    "from_terr": from_terr,
+                    "to_terr": to_terr,
+                    "attack_losses": result["attack_losses"],
+                    "defend_losses": result["defend_losses"],
+                    "conquered": result["conquered"],
+                    "message": f"Bot attacked {to_terr} from {from_terr} {outcome}"
+                }))
 
         else:  # This 'else' belongs to the 'for' loop, runs if it completes without 'break'
-            print("BOT ATTACK: Reached max attack loops.")
+            self._log("BOT ATTACK: Reached max attack loops.")
 
         # After the loop, if the phase is still ATTACK, it means the loop finished without finding attacks or hit its limit.
         if self.phase == GamePhase.ATTACK:
-            print("BOT ATTACK: Loop finished. Forcing phase to FORTIFY.")
-            self.phase = GamePhase.FORTIFY
+            self._log("BOT ATTACK: Loop finished. Forcing phase to FORTIFY.")
+            self._set_phase(GamePhase.FORTIFY)
             
-        print(f"BOT ATTACK: --- Bot attack sequence complete. Final phase: {self.phase} ---")
+        self._log(f"BOT ATTACK: --- Bot attack sequence complete. Final phase: {self.phase} ---")
 
     def _bot_fortify(self):
-        print("Starting bot fortify sequence")
+        bot = self.players[self.current_player_index]
+        self._log("Starting bot fortify sequence")
         
         # Add an action to show phase change
-        self.bot_actions.append({
+        self._record_bot_action({
             "type": "phase_change",
             "phase": "FORTIFY",
             "message": "Bot begins fortify phase"
         })
         
         if self.phase != GamePhase.FORTIFY:
-            print(f"ERROR: Bot fortify called but phase is {self.phase}")
+            self._log(f"ERROR: Bot fortify called but phase is {self.phase}")
             return
             
-        bot_territories = self.bot.get_territories(self)
-        print(f"Bot has {len(bot_territories)} territories for fortification")
+        if bot.strategy is not None:
+            choice = bot.strategy.choose_fortify(self)
+            if choice is None:
+                self._record_bot_action(self._with_search_stats(bot, {
+                    "type": "fortify_skip",
+                    "message": "Bot decides not to fortify"
+                }))
+            else:
+                self._bot_fortify_move(bot, *choice)
+            self._record_bot_action({
+                "type": "turn_end",
+                "message": "Bot ends turn"
+            })
+            return
+
+        bot_territories = bot.get_territories(self)
+        self._log(f"Bot has {len(bot_territories)} territories for fortification")
         
-        # Find territories that are not on the frontier (internal) with more than 1 army
-        from_options = [t for t in bot_territories if self.armies[t] > 1 and not self._is_frontier(t)]
         # Find territories that are on the frontier and need reinforcement
-        to_options = [t for t in bot_territories if self._is_frontier(t)]
+        to_options = self.frontier_territories(bot)
+        # Find territories that are not on the frontier (internal) with more than 1 army
+        frontier = set(to_options)
+        from_options = [t for t in bot_territories if self.armies[t] > 1 and t not in frontier]
 
         if not from_options:
-            print("No source territories available for fortification")
-            self.bot_actions.append({
+            self._log("No source territories available for fortification")
+            self._record_bot_action({
                 "type": "fortify_skip",
                 "message": "Bot has no territories to fortify from (all territories are on the frontier)"
             })
             return
             
         if not to_options:
-            print("No target territories available for fortification")
-            self.bot_actions.append({
+            self._log("No target territories available for fortification")
+            self._record_bot_action({
                 "type": "fortify_skip",
                 "message": "Bot has no frontier territories to fortify"
             })
@@ -480,85 +1151,107 @@ class Game:
 
         # Choose the territory with the most armies as the source
         from_terr = max(from_options, key=lambda t: self.armies[t])
-        print(f"Selected source territory for fortify: {from_terr} with {self.armies[from_terr]} armies")
+        self._log(f"Selected source territory for fortify: {from_terr} with {self.armies[from_terr]} armies")
         
         # Find the frontier territory with the fewest armies that is connected to the source
         best_to_terr = None
         min_armies = float('inf')
 
+        reachable = set(self.reachable_territories(bot, from_terr))
         for to_terr in to_options:
-            # Check if territories are connected through bot-owned territories
-            if self.board.are_connected(from_terr, to_terr, self.bot, self.territory_owner):
+            # Only territories connected through bot-owned territories qualify
+            if to_terr in reachable:
                 if self.armies[to_terr] < min_armies:
                     min_armies = self.armies[to_terr]
                     best_to_terr = to_terr
 
         if best_to_terr:
             armies_to_move = self.armies[from_terr] - 1  # Leave one army behind
-            print(f"Bot fortifying: Moving {armies_to_move} armies from {from_terr} to {best_to_terr}")
-            
-            # Log fortify intent
-            self.bot_actions.append({
-                "type": "fortify",
-                "from_terr": from_terr,
-                "to_terr": best_to_terr,
-                "armies": armies_to_move,
-                "message": f"Bot fortifies by moving {armies_to_move} armies from {from_terr} to {best_to_terr}"
-            })
-            
-            success = self.fortify(self.bot, from_terr, best_to_terr, armies_to_move)
-            if success:
-                print(f"Fortification successful: {from_terr} now has {self.armies[from_terr]} armies, {best_to_terr} now has {self.armies[best_to_terr]} armies")
-                self.bot_actions.append({
-                    "type": "fortify_result",
-                    "from_terr": from_terr,
-                    "to_terr": best_to_terr,
-                    "from_armies": self.armies[from_terr],
-                    "to_armies": self.armies[best_to_terr],
-                    "message": f"Fortification complete: {from_terr} now has {self.armies[from_terr]} armies, {best_to_terr} now has {self.armies[best_to_terr]} armies"
-                })
-            else:
-                print("Fortification failed for some reason")
-                self.bot_actions.append({
-                    "type": "fortify_error",
-                    "message": "Fortification failed due to an unexpected error"
-                })
+            self._bot_fortify_move(bot, from_terr, best_to_terr, armies_to_move)
         else:
-            print("No valid fortification path found between internal and frontier territories")
-            self.bot_actions.append({
+            self._log("No valid fortification path found between internal and frontier territories")
+            self._record_bot_action({
                 "type": "fortify_skip",
                 "message": "No valid path found to fortify between territories"
             })
             
-        print("Bot fortify sequence complete")
+        self._log("Bot fortify sequence complete")
         
         # Add an action to show turn end
-        self.bot_actions.append({
+        self._record_bot_action({
             "type": "turn_end",
             "message": "Bot ends turn"
         })
         
+    def _bot_fortify_move(self, bot: Player, from_terr: str, to_terr: str, armies_to_move: int) -> None:
+        self._log(f"Bot fortifying: Moving {armies_to_move} armies from {from_terr} to {to_terr}")
+        
+        # Log fortify intent
+        self._record_bot_action(self._with_search_stats(bot, {
+            "type": "fortify",
+            "from_terr": from_terr,
+            "to_terr": to_terr,
+            "armies": armies_to_move,
+            "message": f"Bot fortifies by moving {armies_to_move} armies from {from_terr} to {to_terr}"
+        }))
+        
+        success = self.fortify(bot, from_terr, to_terr, armies_to_move)
+        if success:
+            self._log(f"Fortification successful: {from_terr} now has {self.armies[from_terr]} armies, {to_terr} now has {self.armies[to_terr]} armies")
+            self._record_bot_action({
+                "type": "fortify_result",
+                "from_terr": from_terr,
+                "to_terr": to_terr,
+                "from_armies": self.armies[from_terr],
+                "to_armies": self.armies[to_terr],
+                "message": f"Fortification complete: {from_terr} now has {self.armies[from_terr]} armies, {to_terr} now has {self.armies[to_terr]} armies"
+            })
+        else:
+            self._log("Fortification failed for some reason")
+            self._record_bot_action({
+                "type": "fortify_error",
+                "message": "Fortification failed due to an unexpected error"
+            })
+
     def _is_frontier(self, territory: str) -> bool:
-        owner = self.territory_owner[territory]
-        return any(self.territory_owner[n] != owner for n in self.board.adjacency[territory])
+        i = self.board.index[territory]
+        return bool(self.board.neighbor_masks[i] & ~self.owner_masks[self.owners[i]])
+
+    def frontier_territories(self, player: Player) -> List[str]:
+        """The player's territories that border an enemy territory."""
+        mask = self.board.frontier_mask(self.owner_masks[self._seat(player)])
+        names = self.board.territories
+        return [names[i] for i in Board.indices_of(mask)]
+
+    def enemy_neighbors(self, player: Player) -> List[str]:
+        """Enemy territories that border at least one of the player's territories."""
+        owned = self.owner_masks[self._seat(player)]
+        mask = self.board.neighborhood(owned) & ~owned
+        names = self.board.territories
+        return [names[i] for i in Board.indices_of(mask)]
 
     def next_phase(self) -> None:
         current_player = self.players[self.current_player_index]
-        print(f"next_phase called: Current player {current_player.name}, Current phase {self.phase}")
+        self._log(f"next_phase called: Current player {current_player.name}, Current phase {self.phase}")
+        if self.recorder is not None:
+            self.recorder.next_phase()
         
         if self.phase == GamePhase.DEPLOY:
             if self.reinforcements == 0:
+                self.undo_stack.append(("phase", self.phase))
                 self.phase = GamePhase.ATTACK
-                print(f"Transitioning to ATTACK phase")
+                self._log(f"Transitioning to ATTACK phase")
         elif self.phase == GamePhase.ATTACK:
+            self.undo_stack.append(("phase", self.phase))
             self.phase = GamePhase.FORTIFY
-            print(f"Transitioning to FORTIFY phase")
+            self._log(f"Transitioning to FORTIFY phase")
         elif self.phase == GamePhase.FORTIFY:
+            self.undo_stack.clear()
             if current_player.conquered_territory_this_turn:
                 card = self.deck.draw()
                 if card:
                     current_player.cards.append(card)
-                    print(f"Player {current_player.name} received a card: {card.territory} ({card.card_type})")
+                    self._log(f"Player {current_player.name} received a card: {card.territory} ({card.card_type})")
             current_player.conquered_territory_this_turn = False
 
             self.current_player_index = (self.current_player_index + 1) % len(self.players)
@@ -566,85 +1259,121 @@ class Game:
             self.phase = GamePhase.DEPLOY
             self.reinforcements = self._calculate_reinforcements(next_player)
             self.fortified_this_turn = False
-            print(f"Transitioning to DEPLOY phase for player {next_player.name} with {self.reinforcements} reinforcements")
+            self._log(f"Transitioning to DEPLOY phase for player {next_player.name} with {self.reinforcements} reinforcements")
+            if self.recorder is not None:
+                self.recorder.turn_started(self)
 
             if next_player.is_bot:
-                print(f"Bot turn detected - preparing bot actions")
+                self._log(f"Bot turn detected - preparing bot actions")
                 # Instead of calling run_bot_turn directly, we'll prepare bot actions
                 # and let them be fetched via API
                 self.prepare_bot_actions()
 
     def prepare_bot_actions(self):
-        """Prepare bot actions queue without executing them"""
-        print("Preparing bot actions for async execution")
-        # Clear existing actions
-        self.bot_actions = []
-        
-        # Add initial phase change action
-        self.bot_actions.append({
+        """Announce the bot's turn in the action log without executing it"""
+        self._log("Preparing bot actions for async execution")
+        self._bot_turn_announced = True
+        self._record_bot_action({
             "type": "phase_change",
             "phase": "DEPLOY",
             "message": "Bot begins turn"
         })
 
-    def run_bot_turn(self):
-        print("Starting bot turn execution")
+    def bot_time_left(self) -> Optional[float]:
+        """Seconds left before the bot turn's deadline, or None without one."""
+        if self.bot_deadline is None:
+            return None
+        return max(0.0, self.bot_deadline - time.monotonic())
+
+    def run_bot_turn(self, should_stop: Optional[Callable[[], bool]] = None, deadline: Optional[float] = None):
+        """Play the current bot player's whole turn.
+
+        ``should_stop`` is polled between attacks; once it returns True the bot
+        stops attacking and wraps up its turn, e.g. when a time budget runs out.
+        ``deadline`` (a :func:`time.monotonic` time) also caps the time each
+        strategy decision may search.
+        """
+        self.bot_deadline = deadline
+        try:
+            self._run_bot_turn(should_stop)
+        finally:
+            self.bot_deadline = None
+
+    def _run_bot_turn(self, should_stop: Optional[Callable[[], bool]]):
+        self._log("Starting bot turn execution")
+        bot = self.players[self.current_player_index]
         
         # Check if it's actually the bot's turn
-        if self.players[self.current_player_index] != self.bot:
-            print(f"ERROR: Not the bot's turn! Current player is {self.players[self.current_player_index].name}")
+        if not bot.is_bot:
+            self._log(f"ERROR: Not the bot's turn! Current player is {self.players[self.current_player_index].name}")
             return
             
         if self.phase == GamePhase.GAME_OVER:
-            print("Game is over, bot turn skipped")
+            self._log("Game is over, bot turn skipped")
             return
             
-        if not self.bot.has_territories(self):
-            print("Bot has no territories, ending game")
-            self.phase = GamePhase.GAME_OVER
+        if not bot.has_territories(self):
+            self._log("Bot has no territories, ending game")
+            self._set_phase(GamePhase.GAME_OVER)
             return
         
-        print(f"Bot is player {self.current_player_index}, starting actions")
+        self._log(f"Bot is player {self.current_player_index}, starting actions")
         
-        # Set up initial actions if not already done
-        if not self.bot_actions:
-            self.bot_actions.append({
+        # Announce the turn unless prepare_bot_actions already did
+        if not self._bot_turn_announced:
+            self._record_bot_action({
                 "type": "turn_start",
                 "message": "Bot begins turn"
             })
+        self._bot_turn_announced = False
         
         # Deploy phase
-        print(f"Bot starting DEPLOY phase with {self.reinforcements} reinforcements")
+        self._log(f"Bot starting DEPLOY phase with {self.reinforcements} reinforcements")
         self._bot_deploy()
         
         # Attack phase
         if self.phase != GamePhase.GAME_OVER:
-            print("Bot starting ATTACK phase")
-            self.phase = GamePhase.ATTACK  # Explicitly set to ATTACK
-            self._bot_attack()
+            self._log("Bot starting ATTACK phase")
+            self._set_phase(GamePhase.ATTACK)  # Explicitly set to ATTACK
+            self._bot_attack(should_stop)
             
         # Fortify phase
         if self.phase != GamePhase.GAME_OVER and self.phase != GamePhase.ATTACK_MOVE:
-            print("Bot starting FORTIFY phase")
-            self.phase = GamePhase.FORTIFY  # Explicitly set to FORTIFY
+            self._log("Bot starting FORTIFY phase")
+            self._set_phase(GamePhase.FORTIFY)  # Explicitly set to FORTIFY
             self._bot_fortify()
             
         # Move to next player
         if self.phase != GamePhase.GAME_OVER:
-            print("Bot turn complete, moving to next player")
+            self._log("Bot turn complete, moving to next player")
             # Do not call next_phase here as that would trigger another bot turn
-            self.current_player_index = (self.current_player_index + 1) % len(self.players)
+            self._pass_turn()
             next_player = self.players[self.current_player_index]
-            self.phase = GamePhase.DEPLOY
-            self.reinforcements = self._calculate_reinforcements(next_player)
-            self.fortified_this_turn = False
             
-            self.bot_actions.append({
+            self._record_bot_action({
                 "type": "next_player",
                 "player": next_player.name,
                 "message": f"Next player: {next_player.name}"
             })
             
-            print(f"Next player: {next_player.name}")
+            self._log(f"Next player: {next_player.name}")
             
-        print("Bot turn execution complete")
+        self._log("Bot turn execution complete")
+
+    def _pass_turn(self) -> None:
+        """Hand the turn to the next seat without the end-of-turn card draw."""
+        if self.recorder is not None:
+            self.recorder.pass_turn()
+        self.undo_stack.clear()
+        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+        self.phase = GamePhase.DEPLOY
+        self.reinforcements = self._calculate_reinforcements(self.players[self.current_player_index])
+        self.fortified_this_turn = False
+        if self.recorder is not None:
+            self.recorder.turn_started(self)
+
+    def _set_phase(self, phase: GamePhase) -> None:
+        """Change phase outside the rules' own transitions, e.g. in a bot turn."""
+        self.phase = phase
+        if self.recorder is not None:
+            self.recorder.set_phase(phase)
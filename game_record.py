@@ -0,0 +1,677 @@
+"""Compact binary game records, written as games are played, and a replayer.
+
+A record file is ``MAGIC`` followed by records, each an opcode byte and its
+fields as unsigned LEB128 varints, with territories as board indices. One
+file holds any number of games back to back; each starts with a ``GAME``
+record (seed, map, players) and a keyframe of the initial deal. A game's
+events follow in order: deploys, attacks with their dice, sampled battles,
+conquest moves, fortifies, card trades and phase changes. A ``TURN`` marker
+precedes every new turn, and every ``keyframe_interval`` turns the full state
+is written as a keyframe, so :class:`Replayer` can start from the nearest
+keyframe instead of the beginning. A classic-map attack takes 6 bytes and a
+whole self-play game typically a few kilobytes.
+
+Files are only ever appended to. A record cut short by a crash is ignored
+when reading, along with anything after it.
+
+Replay goes through :class:`game.Game`'s own methods with the recorded dice,
+so a replayed game matches the original exactly, including its Zobrist hash::
+
+    python game_record.py games.rec                 # list the games in a file
+    python game_record.py games.rec --game 3 --turn 40
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from game import NO_OWNER, Card, Game, GamePhase
+from risk_board import Board
+
+MAGIC = b"RISKREC1"
+
+# Opcodes. GAME and KEYFRAME carry a length-prefixed payload, the others a
+# fixed number of varints (see _FIELD_COUNTS).
+GAME = 1
+KEYFRAME = 2
+TURN = 3
+DEPLOY = 4
+ATTACK = 5
+BATTLE = 6
+MOVE = 7
+TRADE = 8
+FORTIFY = 9
+NEXT_PHASE = 10
+SET_PHASE = 11
+REINFORCEMENTS = 12
+SET_TERRITORY = 13
+PASS_TURN = 14
+UNDO = 15
+
+_FIELD_COUNTS = {
+    TURN: 0,
+    DEPLOY: 2,  # territory, armies
+    ATTACK: 3,  # src, dst, dice (see _pack_dice)
+    BATTLE: 5,  # src, dst, attack losses, defend losses, minimum move
+    MOVE: 3,  # src, dst, armies
+    TRADE: 3,  # card indices in the player's hand
+    FORTIFY: 3,  # src, dst, armies
+    NEXT_PHASE: 0,
+    SET_PHASE: 1,  # phase
+    REINFORCEMENTS: 1,
+    SET_TERRITORY: 3,  # territory, seat, armies
+    PASS_TURN: 0,
+    UNDO: 1,  # undo kinds as a bitmask plus one, 0 for any kind
+}
+
+PHASES = tuple(GamePhase)
+_PHASE_INDEX = {phase: n for n, phase in enumerate(PHASES)}
+UNDO_KINDS = ("deploy", "battle", "move", "trade", "fortify", "phase")
+CARD_TYPES = ("Infantry", "Cavalry", "Artillery")
+
+
+class GameRecordError(ValueError):
+    pass
+
+
+def _put(buf: bytearray, n: int) -> None:
+    while n > 0x7F:
+        buf.append(n & 0x7F | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _get(data, pos: int) -> Tuple[int, int]:
+    """The varint at ``pos`` and the position after it."""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(n: int) -> int:
+    """Map a signed int to an unsigned one for _put: 0, -1, 1, -2 -> 0, 1, 2, 3."""
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n >> 1 if not n & 1 else -(n >> 1) - 1
+
+
+def _put_str(buf: bytearray, s: str) -> None:
+    encoded = s.encode()
+    _put(buf, len(encoded))
+    buf += encoded
+
+
+def _get_str(data, pos: int) -> Tuple[str, int]:
+    n, pos = _get(data, pos)
+    return bytes(data[pos:pos + n]).decode(), pos + n
+
+
+def _pack_dice(attack_rolls: Sequence[int], defend_rolls: Sequence[int]) -> int:
+    """Dice counts and values in one int, below 12 * 6**5 for 3 dice against 2.
+
+    A territory left empty by an unfinished conquest is attacked with no
+    defending dice, so counts start at zero.
+    """
+    value = 0
+    for die in reversed(list(attack_rolls) + list(defend_rolls)):
+        value = value * 6 + die - 1
+    return value * 12 + len(attack_rolls) * 3 + len(defend_rolls)
+
+
+def _unpack_dice(value: int) -> Tuple[List[int], List[int]]:
+    counts, value = value % 12, value // 12
+    num_attack, num_defend = divmod(counts, 3)
+    dice = []
+    for _ in range(num_attack + num_defend):
+        dice.append(value % 6 + 1)
+        value //= 6
+    return dice[:num_attack], dice[num_attack:]
+
+
+class _Cards:
+    """Cards as small integers: a territory's card is its board index, a wildcard is N."""
+
+    def __init__(self, board: Board):
+        self.board = board
+        self.wildcard = len(board.territories)
+        # Deck order: the card type cycles with the board order of territories
+        self.cards = [Card(t, CARD_TYPES[i % 3]) for i, t in enumerate(board.territories)]
+        self.cards.append(Card("Wildcard", None))
+
+    def id(self, card: Card) -> int:
+        return self.wildcard if card.card_type is None else self.board.index[card.territory]
+
+    def put(self, buf: bytearray, cards: Sequence[Card]) -> None:
+        _put(buf, len(cards))
+        for card in cards:
+            _put(buf, self.id(card))
+
+    def get(self, data, pos: int) -> Tuple[List[Card], int]:
+        n, pos = _get(data, pos)
+        cards = []
+        for _ in range(n):
+            i, pos = _get(data, pos)
+            cards.append(self.cards[i])
+        return cards, pos
+
+
+def _put_details(buf: bytearray, board: Board, details: Optional[Dict]) -> None:
+    if details is None:
+        buf.append(0)
+        return
+    buf.append(1)
+    for value in (board.index[details["from_terr"]], board.index[details["to_terr"]],
+                  details["min_move"], details["max_move"]):
+        _put(buf, value)
+
+
+def _get_details(data, pos: int, board: Board) -> Tuple[Optional[Dict], int]:
+    present = data[pos]
+    pos += 1
+    if not present:
+        return None, pos
+    values = []
+    for _ in range(4):
+        value, pos = _get(data, pos)
+        values.append(value)
+    names = board.territories
+    return {"from_terr": names[values[0]], "to_terr": names[values[1]],
+            "min_move": values[2], "max_move": values[3]}, pos
+
+
+def _encode_state(buf: bytearray, game: Game, cards: _Cards) -> None:
+    """Everything a replay needs to continue from this point (see _decode_state)."""
+    board = game.board
+    for value in (game.current_player_index, _PHASE_INDEX[game.phase], game.reinforcements,
+                  game.fortified_this_turn, game.card_trade_in_bonus):
+        _put(buf, value)
+    for player in game.players:
+        buf.append(player.is_bot | player.conquered_territory_this_turn << 1)
+        cards.put(buf, player.cards)
+    cards.put(buf, game.deck.cards)
+    buf += bytes(seat + 1 for seat in game.owners)
+    for armies in game.army_counts:
+        _put(buf, armies)
+    _put_details(buf, board, game.conquest_move_details)
+
+    _put(buf, len(game.undo_stack))
+    for record in game.undo_stack:
+        kind = record[0]
+        buf.append(UNDO_KINDS.index(kind))
+        if kind in ("deploy", "fortify"):
+            for value in record[1:]:
+                _put(buf, value)
+        elif kind == "battle":
+            _, src, dst, src_armies, dst_armies, dst_owner, phase, details, conquered = record
+            for value in (src, dst, src_armies, dst_armies, dst_owner + 1, _PHASE_INDEX[phase], conquered):
+                _put(buf, value)
+            _put_details(buf, board, details)
+        elif kind == "move":
+            _, src, dst, n, details = record
+            for value in (src, dst, n):
+                _put(buf, value)
+            _put_details(buf, board, details)
+        elif kind == "trade":
+            _, seat, traded, bonus = record
+            _put(buf, seat)
+            _put(buf, bonus)
+            _put(buf, len(traded))
+            for i, card in traded:
+                _put(buf, i)
+                _put(buf, cards.id(card))
+        else:
+            _put(buf, _PHASE_INDEX[record[1]])
+
+
+def _decode_state(data, pos: int, game: Game, cards: _Cards) -> int:
+    """Overwrite ``game``'s state with a keyframe's; return the position after it."""
+    board = game.board
+    values = []
+    for _ in range(5):
+        value, pos = _get(data, pos)
+        values.append(value)
+    game.current_player_index, phase, game.reinforcements, fortified, game.card_trade_in_bonus = values
+    game.phase, game.fortified_this_turn = PHASES[phase], bool(fortified)
+    for player in game.players:
+        flags = data[pos]
+        pos += 1
+        player.is_bot, player.conquered_territory_this_turn = bool(flags & 1), bool(flags & 2)
+        player.cards, pos = cards.get(data, pos)
+    deck, pos = cards.get(data, pos)
+    game.deck.cards = deck
+
+    n = len(board.territories)
+    owners = data[pos:pos + n]
+    pos += n
+    for i in range(n):
+        game._set_owner(i, owners[i] - 1)
+        armies, pos = _get(data, pos)
+        game._set_armies(i, armies)
+    game.conquest_move_details, pos = _get_details(data, pos, board)
+
+    size, pos = _get(data, pos)
+    stack = []
+    for _ in range(size):
+        kind = UNDO_KINDS[data[pos]]
+        pos += 1
+        if kind in ("deploy", "fortify"):
+            fields = []
+            for _ in range(2 if kind == "deploy" else 3):
+                value, pos = _get(data, pos)
+                fields.append(value)
+            stack.append((kind, *fields))
+        elif kind == "battle":
+            fields = []
+            for _ in range(7):
+                value, pos = _get(data, pos)
+                fields.append(value)
+            src, dst, src_armies, dst_armies, dst_owner, phase, conquered = fields
+            details, pos = _get_details(data, pos, board)
+            stack.append((kind, src, dst, src_armies, dst_armies, dst_owner - 1, PHASES[phase], details,
+                          bool(conquered)))
+        elif kind == "move":
+            fields = []
+            for _ in range(3):
+                value, pos = _get(data, pos)
+                fields.append(value)
+            details, pos = _get_details(data, pos, board)
+            stack.append((kind, *fields, details))
+        elif kind == "trade":
+            seat, pos = _get(data, pos)
+            bonus, pos = _get(data, pos)
+            count, pos = _get(data, pos)
+            traded = []
+            for _ in range(count):
+                i, pos = _get(data, pos)
+                card, pos = _get(data, pos)
+                traded.append((i, cards.cards[card]))
+            stack.append((kind, seat, tuple(traded), bonus))
+        else:
+            phase, pos = _get(data, pos)
+            stack.append((kind, PHASES[phase]))
+    game.undo_stack = stack
+    return pos
+
+
+class GameRecordWriter:
+    """Appends the games it is attached to to a record file.
+
+    Implements :class:`game.GameRecorder`. Events are buffered and written
+    when the buffer fills up, at keyframes and on :meth:`flush`; call it when
+    a game ends. Attach one game at a time: events of games played
+    concurrently would interleave.
+    """
+
+    def __init__(self, path: str, keyframe_interval: int = 10, buffer_size: int = 1 << 16):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.buffer_size = buffer_size
+        self._buf = bytearray()
+        self._file = None
+        self._cards: Optional[_Cards] = None
+        self._turn = 0
+
+    def __getstate__(self) -> Dict:
+        # Pickled with its game, e.g. when the registry spills it to disk
+        self.flush()
+        state = self.__dict__.copy()
+        state["_file"] = None
+        return state
+
+    def attach(self, game: Game) -> None:
+        game.recorder = self
+        self.start(game)
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            if self._file.tell() == 0:
+                self._file.write(MAGIC)
+        self._file.write(self._buf)
+        self._file.flush()
+        self._buf.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _emit(self, op: int, *fields: int) -> None:
+        buf = self._buf
+        buf.append(op)
+        for value in fields:
+            _put(buf, value)
+        if len(buf) >= self.buffer_size:
+            self.flush()
+
+    def _keyframe(self, game: Game, turn_start: bool) -> None:
+        payload = bytearray()
+        _put(payload, self._turn)
+        payload.append(turn_start)
+        _encode_state(payload, game, self._cards)
+        self._buf.append(KEYFRAME)
+        _put(self._buf, len(payload))
+        self._buf += payload
+
+    # GameRecorder interface
+
+    def start(self, game: Game) -> None:
+        board = game.board
+        self._cards = _Cards(board)
+        self._turn = 0
+        header = bytearray()
+        # Seeds may be negative
+        _put(header, _zigzag(game.seed))
+        _put_str(header, board.name)
+        _put_str(header, board.source or "")
+        _put(header, len(board.territories))
+        _put(header, len(game.players))
+        for player in game.players:
+            _put_str(header, player.name)
+        self._buf.append(GAME)
+        _put(self._buf, len(header))
+        self._buf += header
+        self._keyframe(game, turn_start=True)
+
+    def deploy(self, territory: int, armies: int) -> None:
+        self._emit(DEPLOY, territory, armies)
+
+    def attack(self, src: int, dst: int, attack_rolls: List[int], defend_rolls: List[int]) -> None:
+        self._emit(ATTACK, src, dst, _pack_dice(attack_rolls, defend_rolls))
+
+    def battle(self, src: int, dst: int, attack_losses: int, defend_losses: int, min_move: int) -> None:
+        self._emit(BATTLE, src, dst, attack_losses, defend_losses, min_move)
+
+    def move(self, src: int, dst: int, armies: int) -> None:
+        self._emit(MOVE, src, dst, armies)
+
+    def trade(self, card_indices: List[int]) -> None:
+        self._emit(TRADE, *card_indices)
+
+    def fortify(self, src: int, dst: int, armies: int) -> None:
+        self._emit(FORTIFY, src, dst, armies)
+
+    def next_phase(self) -> None:
+        self._emit(NEXT_PHASE)
+
+    def set_phase(self, phase: GamePhase) -> None:
+        self._emit(SET_PHASE, _PHASE_INDEX[phase])
+
+    def set_reinforcements(self, reinforcements: int) -> None:
+        self._emit(REINFORCEMENTS, reinforcements)
+
+    def set_territory(self, territory: int, seat: int, armies: int) -> None:
+        self._emit(SET_TERRITORY, territory, seat + 1, armies)
+
+    def pass_turn(self) -> None:
+        self._emit(PASS_TURN)
+
+    def undo(self, kinds: Optional[Tuple[str, ...]]) -> None:
+        mask = 0 if kinds is None else 1 + sum(1 << UNDO_KINDS.index(k) for k in kinds if k in UNDO_KINDS)
+        self._emit(UNDO, mask)
+
+    def turn_started(self, game: Game) -> None:
+        self._turn += 1
+        self._emit(TURN)
+        if self._turn % self.keyframe_interval == 0:
+            self._keyframe(game, turn_start=True)
+            self.flush()
+
+    def restored(self, game: Game) -> None:
+        # Rolled back to an earlier state; record it whole
+        self._keyframe(game, turn_start=False)
+
+
+@dataclass
+class RecordedGame:
+    """Where one game sits in a record file, see :func:`scan`."""
+    offset: int
+    end: int
+    seed: int
+    map_name: str
+    map_source: str
+    num_territories: int
+    players: List[str]
+    turns: int = 0
+    # (turn, offset) of keyframes written at the start of that turn
+    keyframes: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def _open(path: str):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise GameRecordError(f"{path} is empty")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(MAGIC)] != MAGIC:
+        data.close()
+        raise GameRecordError(f"{path} is not a game record")
+    return data
+
+
+def _records(data, pos: int, end: int) -> Iterator[Tuple[int, int, int, Tuple]]:
+    """``(offset, op, next offset, fields)`` of complete records; blobs yield (payload start,)."""
+    while pos < end:
+        start = pos
+        try:
+            op = data[pos]
+            pos += 1
+            if op in (GAME, KEYFRAME):
+                size, pos = _get(data, pos)
+                if pos + size > end:
+                    return
+                fields = (pos,)
+                pos += size
+            else:
+                count = _FIELD_COUNTS[op]
+                values = []
+                for _ in range(count):
+                    value, pos = _get(data, pos)
+                    values.append(value)
+                fields = tuple(values)
+        except (IndexError, KeyError):
+            # Truncated or corrupt tail
+            return
+        if pos > end:
+            return
+        yield start, op, pos, fields
+
+
+def scan(path: str) -> List[RecordedGame]:
+    """Index the games in a record file without replaying them."""
+    data = _open(path)
+    try:
+        games: List[RecordedGame] = []
+        last_end = len(MAGIC)
+        for start, op, pos, fields in _records(data, len(MAGIC), len(data)):
+            if op == GAME:
+                p = fields[0]
+                seed, p = _get(data, p)
+                seed = _unzigzag(seed)
+                map_name, p = _get_str(data, p)
+                map_source, p = _get_str(data, p)
+                num_territories, p = _get(data, p)
+                num_players, p = _get(data, p)
+                players = []
+                for _ in range(num_players):
+                    name, p = _get_str(data, p)
+                    players.append(name)
+                if games:
+                    games[-1].end = start
+                games.append(RecordedGame(start, pos, seed, map_name, map_source, num_territories, players))
+            elif not games:
+                raise GameRecordError("Record does not start with a game")
+            elif op == TURN:
+                games[-1].turns += 1
+            elif op == KEYFRAME:
+                turn, p = _get(data, fields[0])
+                if data[p]:
+                    games[-1].keyframes.append((turn, start))
+            last_end = pos
+        if games:
+            games[-1].end = last_end
+        return games
+    finally:
+        data.close()
+
+
+class Replayer:
+    """Rebuilds the states of one recorded game.
+
+    ``game`` is the game's position in the file or its entry from
+    :func:`scan`, which saves scanning the file again. ``board`` is only
+    needed when the game's map cannot be found by the name or path it was
+    recorded with.
+    """
+
+    def __init__(self, path: str, game: Union[int, RecordedGame] = 0, board: Optional[Board] = None):
+        self.path = path
+        if isinstance(game, RecordedGame):
+            self.info = game
+        else:
+            games = scan(path)
+            if not 0 <= game < len(games):
+                raise GameRecordError(f"{path} holds {len(games)} games, not {game + 1}")
+            self.info = games[game]
+        if board is None:
+            source = self.info.map_source
+            board = Board.load(source if source and os.path.exists(source) else self.info.map_name)
+        if len(board.territories) != self.info.num_territories:
+            raise GameRecordError("Board does not match the recorded map")
+        self.board = board
+        self._cards = _Cards(board)
+
+    def _new_game(self) -> Game:
+        game = Game(verbose=False, board=self.board, seed=self.info.seed)
+        for player, name in zip(game.players, self.info.players):
+            player.name = name
+        return game
+
+    def state_at(self, turn: int) -> Game:
+        """The game at the start of ``turn`` (0 is the initial deal), or at its end if it was shorter."""
+        start = self.info.offset
+        for keyframe_turn, offset in self.info.keyframes:
+            if keyframe_turn <= turn:
+                start = offset
+        for current, game in self._play(start):
+            if current >= turn:
+                return game
+        return game
+
+    def turns(self) -> Iterator[Tuple[int, Game]]:
+        """``(turn, game)`` at the start of every turn, streaming through the record.
+
+        The same :class:`game.Game` is updated and yielded each time.
+        """
+        return self._play(self.info.offset)
+
+    def final_state(self) -> Game:
+        game = None
+        for _, game in self._play(self.info.offset):
+            pass
+        return game
+
+    def _play(self, start: int) -> Iterator[Tuple[int, Game]]:
+        data = _open(self.path)
+        try:
+            game = self._new_game()
+            turn, yielded = 0, None
+            for _, op, _, fields in _records(data, start, self.info.end):
+                if op == TURN:
+                    turn += 1
+                    yielded = turn
+                    yield turn, game
+                elif op == KEYFRAME:
+                    turn, p = _get(data, fields[0])
+                    _decode_state(data, p + 1, game, self._cards)
+                    # A keyframe right after a TURN marker holds the state
+                    # just yielded; one written after a rollback is mid-turn
+                    if data[p] and yielded != turn:
+                        yielded = turn
+                        yield turn, game
+                elif op != GAME:
+                    self._apply(game, op, fields)
+        finally:
+            data.close()
+
+    def _apply(self, game: Game, op: int, fields: Tuple) -> None:
+        names = self.board.territories
+        player = game.players[game.current_player_index]
+        ok = True
+        if op == DEPLOY:
+            ok = game.deploy(player, names[fields[0]], fields[1])
+        elif op == ATTACK:
+            attack_rolls, defend_rolls = _unpack_dice(fields[2])
+            ok = game.attack(player, names[fields[0]], names[fields[1]], len(attack_rolls),
+                             rolls=(attack_rolls, defend_rolls))["success"]
+        elif op == BATTLE:
+            game._apply_battle_losses(*fields)
+        elif op == MOVE:
+            ok = game.move_after_conquest(player, fields[2])["success"]
+        elif op == TRADE:
+            ok = game.trade_in_cards(player, list(fields))["success"]
+        elif op == FORTIFY:
+            ok = game.fortify(player, names[fields[0]], names[fields[1]], fields[2])
+        elif op == NEXT_PHASE:
+            game.next_phase()
+        elif op == SET_PHASE:
+            game.phase = PHASES[fields[0]]
+        elif op == REINFORCEMENTS:
+            game.reinforcements = fields[0]
+        elif op == SET_TERRITORY:
+            territory, seat, armies = fields
+            if seat - 1 != NO_OWNER:
+                game._set_owner(territory, seat - 1)
+            game._set_armies(territory, armies)
+        elif op == PASS_TURN:
+            game._pass_turn()
+        elif op == UNDO:
+            mask = fields[0]
+            kinds = None if mask == 0 else tuple(k for n, k in enumerate(UNDO_KINDS) if (mask - 1) >> n & 1)
+            game.undo(kinds)
+        if not ok:
+            raise GameRecordError(f"Replay diverged from the record at opcode {op}")
+
+
+def main() -> None:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Inspect and replay game records")
+    parser.add_argument("path")
+    parser.add_argument("--game", type=int, help="Replay this game (0-based)")
+    parser.add_argument("--turn", type=int, help="Show the state at the start of this turn")
+    args = parser.parse_args()
+
+    if args.game is None:
+        for n, info in enumerate(scan(args.path)):
+            print(f"{n}: seed {info.seed}, map {info.map_name}, {info.turns} turns, "
+                  f"{len(info.keyframes)} keyframes, {info.end - info.offset} bytes")
+        return
+
+    replayer = Replayer(args.path, args.game)
+    game = replayer.final_state() if args.turn is None else replayer.state_at(args.turn)
+    print(json.dumps({
+        "current_player": game.players[game.current_player_index].name,
+        "phase": game.phase.value,
+        "territories": {p.name: p.territory_count(game) for p in game.players},
+        "armies": {p.name: sum(game.army_counts[i] for i in game.territories_by_seat[s])
+                   for s, p in enumerate(game.players)},
+        "zobrist_hash": f"{game.zobrist_hash:016x}",
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Background execution of bot turns for the web server.
+
+Bot turns are submitted to a bounded thread pool instead of running inside the
+request handler. Each submission becomes a :class:`BotJob` that can be polled,
+streamed, or cancelled, and every turn runs under a wall-clock budget after
+which the bot stops attacking and ends its turn.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from game import Game
+from registry import GameRegistry
+
+# Events after which a job produces nothing more
+TERMINAL_EVENTS = ("done", "bot_error", "cancelled")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class BotJob:
+    job_id: str
+    game_id: str
+    base_version: Optional[int]
+    time_budget: Optional[float]
+    status: str = "queued"  # queued, running, done, cancelled, failed
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # (event name, payload) pairs in the order they happened
+    events: List[Tuple[str, Dict]] = field(default_factory=list)
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    changed: threading.Condition = field(default_factory=threading.Condition)
+    future: Optional[object] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled", "failed")
+
+    def emit(self, event: str, data: Dict) -> None:
+        with self.changed:
+            self.events.append((event, data))
+            self.changed.notify_all()
+
+    def follow(self, poll_interval: float = 15.0) -> Iterator[Tuple[str, Dict]]:
+        """Yield events as they are emitted until the job finishes.
+
+        Yields ``("keepalive", {})`` when nothing happened for ``poll_interval``
+        seconds so callers can keep idle connections open.
+        """
+        cursor = 0
+        while True:
+            with self.changed:
+                if cursor >= len(self.events):
+                    self.changed.wait(poll_interval)
+                pending = self.events[cursor:]
+            if not pending:
+                yield "keepalive", {}
+                continue
+            cursor += len(pending)
+            for event, data in pending:
+                yield event, data
+                if event in TERMINAL_EVENTS:
+                    return
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "error": self.error,
+            "actions": [data["action"] for event, data in self.events if event == "bot_action"],
+            "queued_seconds": None if self.started_at is None else self.started_at - self.submitted_at,
+            "run_seconds": None if self.started_at is None or self.finished_at is None
+            else self.finished_at - self.started_at,
+        }
+
+
+class BotTurnRunner:
+    def __init__(
+        self,
+        registry: GameRegistry,
+        state_fn: Callable[[Game, Optional[int]], Dict],
+        max_workers: int = 4,
+        max_pending: int = 64,
+        time_budget: Optional[float] = 5.0,
+        keep_finished: int = 1000,
+    ):
+        self.registry = registry
+        # Serializes the state delta sent along with each action
+        self.state_fn = state_fn
+        self.max_pending = max_pending
+        self.time_budget = time_budget
+        self.keep_finished = keep_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bot-turn")
+        self._jobs: OrderedDict[str, BotJob] = OrderedDict()
+        self._active_by_game: Dict[str, BotJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, game_id: str, since: Optional[int] = None, time_budget: Optional[float] = None) -> BotJob:
+        """Queue the bot turn for a game, or return the one already queued or running."""
+        with self._lock:
+            active = self._active_by_game.get(game_id)
+            if active is not None and not active.finished:
+                return active
+            pending = sum(1 for job in self._active_by_game.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise JobQueueFull("Too many bot turns in progress")
+
+            job = BotJob(
+                job_id=uuid.uuid4().hex,
+                game_id=game_id,
+                base_version=since,
+                time_budget=self.time_budget if time_budget is None else time_budget,
+            )
+            self._jobs[job.job_id] = job
+            self._active_by_game[game_id] = job
+            self._trim()
+            job.future = self._pool.submit(self._run, job)
+            return job
+
+    def get(self, job_id: str) -> Optional[BotJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[BotJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            # Never started, so the game was not touched
+            self._finish(job, "cancelled")
+            job.emit("cancelled", {})
+        return job
+
+    def _trim(self) -> None:
+        while len(self._jobs) > self.keep_finished:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.finished:
+                break
+            del self._jobs[oldest_id]
+
+    def _finish(self, job: BotJob, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.finished_at = time.monotonic()
+            if self._active_by_game.get(job.game_id) is job:
+                del self._active_by_game[job.game_id]
+
+    def _run(self, job: BotJob) -> None:
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.monotonic()
+        deadline = None if job.time_budget is None else job.started_at + job.time_budget
+
+        def should_stop() -> bool:
+            return job.cancel_event.is_set() or (deadline is not None and time.monotonic() > deadline)
+
+        try:
+            with self.registry.lease(job.game_id) as game:
+                if not game.players[game.current_player_index].is_bot:
+                    self._finish(job, "failed", "Not the bot's turn")
+                    job.emit("bot_error", {"error": job.error})
+                    return
+
+                version = job.base_version if job.base_version is not None else game.version
+
+                def push(action: Dict) -> None:
+                    nonlocal version
+                    job.emit("bot_action", {
+                        "action": action,
+                        "seq": game.bot_actions.last_seq,
+                        "state": self.state_fn(game, version),
+                    })
+                    version = game.version
+
+                game.action_listener = push
+                try:
+                    game.run_bot_turn(should_stop, deadline)
+                finally:
+                    game.action_listener = None
+                state = self.state_fn(game, version)
+
+            status = "cancelled" if job.cancel_event.is_set() else "done"
+            self._finish(job, status)
+            job.emit("done", {"state": state, "status": status})
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job, "failed", str(e))
+            job.emit("bot_error", {"error": str(e)})
@@ -0,0 +1,364 @@
+"""Monte Carlo tree search bot.
+
+Plugs into :class:`game.Game` as a :class:`game.BotStrategy`: assign it to a
+bot player's ``strategy`` and every deploy, attack and fortify decision of
+that player is searched instead of taken from the built-in heuristics.
+
+The search works on macro actions, one per decision:
+
+- ``("deploy", i)`` puts all reinforcements on territory ``i``
+- ``("attack", src, dst)`` blitzes until conquest or until ``src`` is down to
+  one army, then moves all but one army into the conquered territory
+- ``("end_attack",)`` stops attacking
+- ``("fortify", src, dst)`` moves all but one army and ends the turn
+- ``("end_turn",)`` ends the turn without fortifying
+
+The tree spans the rest of the bot's turn and is open-loop: each iteration
+replays the chosen actions on a fresh :meth:`game.Game.clone` with new dice, so
+nodes average over chance outcomes. From the leaf, the turn is finished with a
+greedy policy, every seat then plays ``rollout_turns`` turns with the built-in
+heuristic bot, and the position is scored for the searching seat.
+
+With ``processes > 1`` the search is root-parallel: each worker process grows
+its own tree from the same position and the root visit counts are summed.
+
+All randomness comes from the game's ``search`` stream (see
+:class:`game.GameRandom`), so searches are reproducible from the game's seed
+and games searching at the same time do not share a generator.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from battle import attack_odds
+from game import Game, GamePhase
+
+Action = Tuple
+
+END_ATTACK: Action = ("end_attack",)
+END_TURN: Action = ("end_turn",)
+
+# Worker pools shared by all bots in this process, keyed by size
+_POOLS: Dict[int, ProcessPoolExecutor] = {}
+
+
+def _pool(processes: int) -> ProcessPoolExecutor:
+    pool = _POOLS.get(processes)
+    if pool is None:
+        pool = _POOLS[processes] = ProcessPoolExecutor(max_workers=processes)
+    return pool
+
+
+class _Node:
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children: Dict[Action, _Node] = {}
+        self.visits = 0
+        self.value = 0.0
+
+
+class MCTSBot:
+    def __init__(
+        self,
+        time_budget: Optional[float] = 1.0,
+        iterations: Optional[int] = None,
+        processes: int = 1,
+        exploration: float = 0.7,
+        rollout_turns: int = 2,
+        min_attack_odds: float = 0.2,
+        max_fortify_sources: int = 3,
+        max_fortify_targets: int = 4,
+    ):
+        """``time_budget`` (seconds) and ``iterations`` bound each decision;
+        the search stops at whichever is reached first."""
+        if time_budget is None and iterations is None:
+            raise ValueError("Need a time budget or an iteration budget")
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.processes = processes
+        self.exploration = exploration
+        self.rollout_turns = rollout_turns
+        # Attacks less likely to succeed than this are not searched
+        self.min_attack_odds = min_attack_odds
+        self.max_fortify_sources = max_fortify_sources
+        self.max_fortify_targets = max_fortify_targets
+        self.last_search: Optional[Dict] = None
+        self.total_iterations = 0
+        self.total_seconds = 0.0
+
+    @property
+    def iterations_per_second(self) -> float:
+        return self.total_iterations / self.total_seconds if self.total_seconds else 0.0
+
+    # BotStrategy interface
+
+    def choose_deploy(self, game: Game) -> str:
+        _, i = self._decide(game, "deploy")
+        return game.board.territories[i]
+
+    def choose_attack(self, game: Game) -> Optional[Tuple[str, str]]:
+        action = self._decide(game, "attack")
+        if action == END_ATTACK:
+            return None
+        names = game.board.territories
+        return names[action[1]], names[action[2]]
+
+    def choose_fortify(self, game: Game) -> Optional[Tuple[str, str, int]]:
+        action = self._decide(game, "fortify")
+        if action == END_TURN:
+            return None
+        _, src, dst = action
+        names = game.board.territories
+        return names[src], names[dst], game.army_counts[src] - 1
+
+    # Search
+
+    def _decide(self, game: Game, decision: str) -> Action:
+        root = game.clone()
+        # Rollouts play every seat with the heuristic bot
+        for player in root.players:
+            player.is_bot = True
+        seat = root.current_player_index
+        candidates = self._actions(root, seat)
+
+        # Never search past the deadline of the bot turn
+        time_budget = self.time_budget
+        time_left = game.bot_time_left()
+        if time_left is not None:
+            time_budget = time_left if time_budget is None else min(time_budget, time_left)
+
+        start = time.perf_counter()
+        if len(candidates) == 1:
+            best, iterations = candidates[0], 0
+        else:
+            stats, iterations = self._search(root, time_budget, game.rng.search)
+            # Most visited is the most robust choice; unvisited candidates lose
+            best = max(candidates, key=lambda a: stats.get(a, (0, 0.0)))
+        elapsed = time.perf_counter() - start
+
+        self.total_iterations += iterations
+        self.total_seconds += elapsed
+        self.last_search = {
+            "decision": decision,
+            "candidates": len(candidates),
+            "iterations": iterations,
+            "seconds": round(elapsed, 4),
+            "iterations_per_second": round(iterations / elapsed) if elapsed > 0 else None,
+            "processes": self.processes,
+        }
+        return best
+
+    def _search(
+        self, root: Game, time_budget: Optional[float], rng: random.Random
+    ) -> Tuple[Dict[Action, Tuple[int, float]], int]:
+        """Root visit counts and mean values for every searched action, and the iteration count."""
+        if self.processes <= 1:
+            return self._search_tree(root, time_budget, self.iterations, rng)
+
+        iterations = None if self.iterations is None else -(-self.iterations // self.processes)
+        futures = [
+            _pool(self.processes).submit(
+                _search_worker, self, root, time_budget, iterations, rng.getrandbits(64)
+            )
+            for _ in range(self.processes)
+        ]
+        merged: Dict[Action, Tuple[int, float]] = {}
+        total = 0
+        for future in futures:
+            stats, count = future.result()
+            total += count
+            for action, (visits, mean) in stats.items():
+                seen, seen_mean = merged.get(action, (0, 0.0))
+                merged[action] = (seen + visits, (seen * seen_mean + visits * mean) / (seen + visits))
+        return merged, total
+
+    def _search_tree(
+        self, root: Game, time_budget: Optional[float], max_iterations: Optional[int], rng: random.Random
+    ) -> Tuple[Dict[Action, Tuple[int, float]], int]:
+        seat = root.current_player_index
+        tree = _Node()
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        iterations = 0
+        while (max_iterations is None or iterations < max_iterations) and (
+            deadline is None or time.perf_counter() < deadline
+        ):
+            # New dice streams per iteration
+            sim = root.clone(seed=rng.getrandbits(64))
+            node, path = tree, [tree]
+            while True:
+                legal = self._actions(sim, seat)
+                if not legal:
+                    break
+                untried = [a for a in legal if a not in node.children]
+                if untried:
+                    action = rng.choice(untried)
+                    node.children[action] = node = _Node()
+                    path.append(node)
+                    self._apply(sim, action)
+                    break
+                log_visits = math.log(node.visits)
+                action = max(legal, key=lambda a: self._ucb(node.children[a], log_visits))
+                node = node.children[action]
+                path.append(node)
+                self._apply(sim, action)
+
+            value = self._rollout(sim, seat)
+            for visited in path:
+                visited.visits += 1
+                visited.value += value
+            iterations += 1
+
+        stats = {action: (child.visits, child.value / child.visits) for action, child in tree.children.items()}
+        return stats, iterations
+
+    def _ucb(self, node: _Node, log_parent_visits: float) -> float:
+        return node.value / node.visits + self.exploration * math.sqrt(log_parent_visits / node.visits)
+
+    # Rules
+
+    def _actions(self, game: Game, seat: int) -> List[Action]:
+        """Candidate actions for ``seat``; empty once its turn is over."""
+        if game.phase == GamePhase.GAME_OVER or game.current_player_index != seat:
+            return []
+        board, armies, owners = game.board, game.army_counts, game.owners
+        owned = game.owner_masks[seat]
+
+        if game.phase == GamePhase.DEPLOY:
+            targets = board.frontier_mask(owned) or owned
+            return [("deploy", i) for i in board.indices_of(targets)]
+
+        if game.phase == GamePhase.ATTACK:
+            actions = [END_ATTACK]
+            for src in game.territories_by_seat[seat]:
+                if armies[src] < 2:
+                    continue
+                for dst in board.neighbors[src]:
+                    if owners[dst] != seat and (
+                        attack_odds(armies[src] - 1, armies[dst]).win_probability >= self.min_attack_odds
+                    ):
+                        actions.append(("attack", src, dst))
+            return actions
+
+        if game.phase == GamePhase.FORTIFY and not game.fortified_this_turn:
+            frontier = board.frontier_mask(owned)
+            # Armies are most useful moved off interior territories, then off large stacks
+            sources = sorted(
+                (i for i in game.territories_by_seat[seat] if armies[i] > 1),
+                key=lambda i: (bool(frontier >> i & 1), -armies[i]),
+            )[:self.max_fortify_sources]
+            # The frontier territories under the most pressure
+            targets = sorted(board.indices_of(frontier), key=lambda i: armies[i] - self._threat(game, i, seat))
+            targets = targets[:self.max_fortify_targets]
+            labels, _ = game._seat_components(seat)
+            actions = [END_TURN]
+            for src in sources:
+                actions.extend(("fortify", src, dst) for dst in targets if dst != src and labels[dst] == labels[src])
+            return actions
+
+        return [END_TURN]
+
+    @staticmethod
+    def _threat(game: Game, i: int, seat: int) -> int:
+        return sum(game.army_counts[n] for n in game.board.neighbors[i] if game.owners[n] != seat)
+
+    @staticmethod
+    def _apply(game: Game, action: Action) -> None:
+        player = game.players[game.current_player_index]
+        names = game.board.territories
+        kind = action[0]
+        if kind == "deploy":
+            game.deploy(player, names[action[1]], game.reinforcements)
+            game.next_phase()
+        elif kind == "attack":
+            result = game.blitz(player, names[action[1]], names[action[2]], sample=True)
+            if result.get("conquered") and game.phase == GamePhase.ATTACK_MOVE:
+                game.move_after_conquest(player, game.conquest_move_details["max_move"])
+        elif kind == "end_attack":
+            game.next_phase()
+        elif kind == "fortify":
+            _, src, dst = action
+            game.fortify(player, names[src], names[dst], game.army_counts[src] - 1)
+            game.next_phase()
+        else:
+            game.next_phase()
+
+    def _default_action(self, game: Game, legal: List[Action]) -> Action:
+        """Greedy policy used to finish the searching seat's turn in rollouts."""
+        armies = game.army_counts
+        if game.phase == GamePhase.DEPLOY:
+            return max(legal, key=lambda a: armies[a[1]])
+        if game.phase == GamePhase.ATTACK:
+            best, best_odds = END_ATTACK, 0.6
+            for action in legal:
+                if action[0] == "attack":
+                    odds = attack_odds(armies[action[1]] - 1, armies[action[2]]).win_probability
+                    if odds > best_odds:
+                        best, best_odds = action, odds
+            return best
+        return END_TURN
+
+    def _rollout(self, game: Game, seat: int) -> float:
+        while True:
+            legal = self._actions(game, seat)
+            if not legal:
+                break
+            self._apply(game, self._default_action(game, legal))
+        for _ in range(self.rollout_turns * len(game.players)):
+            if game.phase == GamePhase.GAME_OVER:
+                break
+            game.run_bot_turn()
+        return self.evaluate(game, seat)
+
+    @staticmethod
+    def evaluate(game: Game, seat: int) -> float:
+        """Score in [0, 1] of the position for ``seat``: 1 is a won game."""
+        if game.phase == GamePhase.GAME_OVER:
+            return 1.0 if game.territories_by_seat[seat] else 0.0
+        owned = game.territories_by_seat[seat]
+        armies = game.army_counts
+        territory_share = len(owned) / len(armies)
+        army_share = sum(armies[i] for i in owned) / (sum(armies) or 1)
+        incomes = [game._calculate_reinforcements(p) for p in game.players]
+        income_share = incomes[seat] / sum(incomes)
+        return 0.4 * territory_share + 0.4 * army_share + 0.2 * income_share
+
+
+def _search_worker(
+    bot: MCTSBot, root: Game, time_budget: Optional[float], iterations: Optional[int], seed: int
+) -> Tuple[Dict[Action, Tuple[int, float]], int]:
+    # Each worker gets its own seed from the game's search stream, so trees differ
+    return bot._search_tree(root, time_budget, iterations, random.Random(seed))
+
+
+def benchmark(time_budget: float = 2.0, processes: int = 1, seed: int = 0) -> Dict:
+    """Iterations per second of one attack-phase search from a fresh game."""
+    game = Game(verbose=False, seed=seed)
+    player = game.players[game.current_player_index]
+    game.deploy(player, player.get_territories(game)[0], game.reinforcements)
+    game.next_phase()
+    bot = MCTSBot(time_budget=time_budget, processes=processes)
+    bot.choose_attack(game)
+    return dict(bot.last_search, cpus=os.cpu_count())
+
+
+def main() -> None:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Measure MCTS search throughput")
+    parser.add_argument("--time", type=float, default=2.0, help="Seconds to search")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.time, args.processes, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
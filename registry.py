@@ -0,0 +1,156 @@
+"""Registry of live games for the web server.
+
+Each browser session gets its own :class:`game.Game` guarded by its own lock.
+The number of games kept in memory is capped: the least recently used games
+and games idle for too long are evicted, and can optionally be spilled to
+local disk and transparently reloaded on next use.
+
+The registry lock only guards the index of entries. Games are created,
+reloaded and spilled under their own entry's lock, so disk I/O for one game
+never holds up requests for the others.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from game import Game
+
+
+@dataclass
+class GameEntry:
+    game_id: str
+    game: Optional[Game] = None  # None until created or reloaded under ``lock``
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    last_used: float = field(default_factory=time.monotonic)
+    leases: int = 0  # Requests holding or waiting for the lock; never evicted while > 0
+    evicted: bool = False  # Out of the index and waiting to be spilled
+
+
+class GameRegistry:
+    def __init__(
+        self,
+        factory: Callable[[], Game] = Game,
+        max_games: int = 500,
+        idle_timeout: Optional[float] = 3600.0,
+        spill_dir: Optional[str] = None,
+    ):
+        self.factory = factory
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        # Ordered from least to most recently used
+        self._entries: OrderedDict[str, GameEntry] = OrderedDict()
+        # Evicted entries until their spill finishes; a request for one takes it back
+        self._spilling: Dict[str, GameEntry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def new_game_id() -> str:
+        return uuid.uuid4().hex
+
+    @contextmanager
+    def lease(self, game_id: str) -> Iterator[Game]:
+        """Hold the game's lock for the duration of a request."""
+        with self._lock:
+            entry = self._entries.get(game_id)
+            if entry is None:
+                entry = self._spilling.pop(game_id, None) or GameEntry(game_id)
+                entry.evicted = False
+                self._entries[game_id] = entry
+            else:
+                self._entries.move_to_end(game_id)
+            entry.leases += 1
+            victims = self._evict()
+        try:
+            for victim in victims:
+                self._spill(victim)
+            with entry.lock:
+                if entry.game is None:
+                    entry.game = self._load_spilled(game_id) or self.factory()
+                entry.last_used = time.monotonic()
+                yield entry.game
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    def discard(self, game_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(game_id, None) or self._spilling.pop(game_id, None)
+            if entry is not None:
+                entry.evicted = False
+        path = self._spill_path(game_id)
+        if path is None:
+            return
+        # Waits for a spill of this game in progress, so it is not written back afterwards
+        with entry.lock if entry is not None else nullcontext():
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _evict(self) -> List[GameEntry]:
+        """Take the entries to evict out of the index; the caller spills them after releasing the lock."""
+        now = time.monotonic()
+        victims = []
+        for game_id, entry in list(self._entries.items()):
+            idle = self.idle_timeout is not None and now - entry.last_used > self.idle_timeout
+            if not idle and len(self._entries) <= self.max_games:
+                break
+            # Games with a request in flight stay put
+            if entry.leases:
+                continue
+            del self._entries[game_id]
+            if self.spill_dir and entry.game is not None:
+                entry.evicted = True
+                self._spilling[game_id] = entry
+                victims.append(entry)
+        return victims
+
+    def _spill_path(self, game_id: str) -> Optional[str]:
+        if not self.spill_dir:
+            return None
+        return os.path.join(self.spill_dir, f"{game_id}.pickle")
+
+    def _spill(self, entry: GameEntry) -> None:
+        path = self._spill_path(entry.game_id)
+        with entry.lock:
+            with self._lock:
+                # Taken back by a request or discarded since it was evicted
+                if not entry.evicted:
+                    return
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry.game, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            with self._lock:
+                taken_back = self._entries.get(entry.game_id) is entry
+                if self._spilling.get(entry.game_id) is entry:
+                    # Written out; later spills queued for the same eviction have nothing to do
+                    entry.evicted = False
+                    del self._spilling[entry.game_id]
+            if taken_back:
+                # Leased again while being written; the game in memory is the live one,
+                # and a file left behind would later be reloaded as stale state
+                os.remove(path)
+
+    def _load_spilled(self, game_id: str) -> Optional[Game]:
+        path = self._spill_path(game_id)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            game = pickle.load(f)
+        os.remove(path)
+        return game
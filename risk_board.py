@@ -1,259 +1,283 @@
 """Risk board representation.
 
-This module defines the continents, territories and adjacency graph for the classic Risk board game. It provides a CLI to print or draw the board.
+Boards are loaded from JSON map files (see ``maps/classic.json``) that are
+validated once and compiled into an indexed form for the game engine. A board
+is immutable topology: :meth:`Board.load` returns one shared instance per map
+that every game on it references, and games keep only their mutable state.
+The module also generates synthetic maps of any size for scaling tests, and
+provides a CLI to print, draw or generate boards.
 """
 
-from dataclasses import dataclass, field
-from typing import Dict, List
+import hashlib
+import json
+import os
+import random
+from collections import deque
+from dataclasses import InitVar, dataclass, field
+from functools import cached_property, lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
 
+MAPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps")
+DEFAULT_MAP = "classic"
 
-@dataclass
+
+class MapError(ValueError):
+    pass
+
+
+def validate_map(
+    continents: Dict[str, List[str]],
+    adjacency: Dict[str, List[str]],
+    continent_bonuses: Dict[str, int],
+    positions: Dict[str, Tuple[float, float]],
+) -> None:
+    """Raise MapError unless the map is usable by the game engine."""
+    if not adjacency:
+        raise MapError("Map has no territories")
+    for terr, neighbors in adjacency.items():
+        if len(set(neighbors)) != len(neighbors):
+            raise MapError(f"{terr} lists a neighbour twice")
+        for n in neighbors:
+            if n == terr:
+                raise MapError(f"{terr} borders itself")
+            if n not in adjacency:
+                raise MapError(f"{terr} borders unknown territory {n}")
+            if terr not in adjacency[n]:
+                raise MapError(f"Adjacency is not symmetric: {terr} -> {n}")
+
+    seen: Dict[str, str] = {}
+    for continent, members in continents.items():
+        if continent not in continent_bonuses:
+            raise MapError(f"Continent {continent} has no bonus")
+        if not members:
+            raise MapError(f"Continent {continent} is empty")
+        for terr in members:
+            if terr not in adjacency:
+                raise MapError(f"Continent {continent} lists unknown territory {terr}")
+            if terr in seen:
+                raise MapError(f"{terr} is in both {seen[terr]} and {continent}")
+            seen[terr] = continent
+    missing = [t for t in adjacency if t not in seen]
+    if missing:
+        raise MapError(f"Territories without a continent: {', '.join(missing[:5])}")
+    unplaced = [t for t in adjacency if t not in positions]
+    if unplaced:
+        raise MapError(f"Territories without a position: {', '.join(unplaced[:5])}")
+
+    # Every territory must be reachable, or a player could never be eliminated
+    start = next(iter(adjacency))
+    reached = {start}
+    q = deque([start])
+    while q:
+        for n in adjacency[q.popleft()]:
+            if n not in reached:
+                reached.add(n)
+                q.append(n)
+    if len(reached) != len(adjacency):
+        raise MapError("Map is not connected")
+
+
+def _map_path(name_or_path: str) -> str:
+    if not os.path.exists(name_or_path):
+        name_or_path = os.path.join(MAPS_DIR, f"{name_or_path}.json")
+    return os.path.abspath(name_or_path)
+
+
+@lru_cache(maxsize=32)
+def load_map_data(name_or_path: str) -> Dict:
+    """Read and validate a map file once; later calls return the cached result.
+
+    ``name_or_path`` is a file path or the name of a map in ``maps/``.
+    """
+    with open(_map_path(name_or_path)) as f:
+        data = json.load(f)
+    fields = Board.fields_from_dict(data)
+    validate_map(fields["continents"], fields["adjacency"], fields["continent_bonuses"], fields["positions"])
+    return fields
+
+
+@lru_cache(maxsize=32)
+def _shared_board(path: str) -> "Board":
+    return Board(**load_map_data(path), source=path, validate=False)
+
+
+@dataclass(frozen=True, eq=False)
 class Board:
-    continents: Dict[str, List[str]] = field(default_factory=dict)
-    adjacency: Dict[str, List[str]] = field(default_factory=dict)
-    continent_bonuses: Dict[str, int] = field(default_factory=dict)
-
-    def __post_init__(self) -> None:
-        self._init_continents()
-        self._init_adjacency()
-        self._init_positions()
-        self._init_continent_bonuses()
-
-    def _init_continents(self) -> None:
-        self.continents = {
-            "North America": [
-                "Alaska",
-                "Northwest Territory",
-                "Greenland",
-                "Alberta",
-                "Ontario",
-                "Quebec",
-                "Western United States",
-                "Eastern United States",
-                "Central America",
-            ],
-            "South America": [
-                "Venezuela",
-                "Peru",
-                "Brazil",
-                "Argentina",
-            ],
-            "Europe": [
-                "Iceland",
-                "Scandinavia",
-                "Ukraine",
-                "Great Britain",
-                "Northern Europe",
-                "Western Europe",
-                "Southern Europe",
-            ],
-            "Africa": [
-                "North Africa",
-                "Egypt",
-                "East Africa",
-                "Congo",
-                "South Africa",
-                "Madagascar",
-            ],
-            "Asia": [
-                "Ural",
-                "Siberia",
-                "Yakutsk",
-                "Kamchatka",
-                "Irkutsk",
-                "Mongolia",
-                "Japan",
-                "Afghanistan",
-                "Middle East",
-                "India",
-                "Siam",
-                "China",
-            ],
-            "Australia": [
-                "Indonesia",
-                "New Guinea",
-                "Western Australia",
-                "Eastern Australia",
-            ],
+    """Immutable map topology, shared by every game played on it.
+
+    The name-keyed fields are read-only mappings of tuples; the indexed form
+    used by the engine is built once in ``__post_init__``. Boards compare and
+    hash by identity, and copying one returns the same object.
+    """
+
+    continents: Mapping[str, Sequence[str]] = field(default_factory=dict)
+    adjacency: Mapping[str, Sequence[str]] = field(default_factory=dict)
+    continent_bonuses: Mapping[str, int] = field(default_factory=dict)
+    positions: Mapping[str, Tuple[float, float]] = field(default_factory=dict)
+    name: str = "custom"
+    # Absolute path of the map file for boards from Board.load, so pickles
+    # can refer to the map instead of carrying it
+    source: Optional[str] = None
+    # Maps that were already validated (see load_map_data) skip validation
+    validate: InitVar[bool] = True
+
+    # Indexed form, set by _init_index
+    territories: Tuple[str, ...] = field(init=False, repr=False)
+    index: Mapping[str, int] = field(init=False, repr=False)
+    neighbors: Tuple[Tuple[int, ...], ...] = field(init=False, repr=False)
+    continent_members: Mapping[str, Tuple[int, ...]] = field(init=False, repr=False)
+    continent_names: Tuple[str, ...] = field(init=False, repr=False)
+    continent_index: Mapping[str, int] = field(init=False, repr=False)
+    continent_sizes: Tuple[int, ...] = field(init=False, repr=False)
+    continent_bonus_values: Tuple[int, ...] = field(init=False, repr=False)
+    continent_of: Tuple[int, ...] = field(init=False, repr=False)
+    neighbor_masks: Tuple[int, ...] = field(init=False, repr=False)
+    full_mask: int = field(init=False, repr=False)
+
+    def __post_init__(self, validate: bool) -> None:
+        if not self.adjacency:
+            # The classic map. Board.load() returns the instance games share;
+            # this one is a private copy that pickles as a reference to it.
+            fields = load_map_data(DEFAULT_MAP)
+            if self.source is None:
+                object.__setattr__(self, "source", _map_path(DEFAULT_MAP))
+        else:
+            if validate:
+                validate_map(self.continents, self.adjacency, self.continent_bonuses, self.positions)
+            fields = {
+                "continents": self.continents,
+                "adjacency": self.adjacency,
+                "continent_bonuses": self.continent_bonuses,
+                "positions": self.positions,
+            }
+        set_field = object.__setattr__
+        for key in ("continents", "adjacency"):
+            set_field(self, key, MappingProxyType({k: tuple(v) for k, v in fields[key].items()}))
+        set_field(self, "continent_bonuses", MappingProxyType(dict(fields["continent_bonuses"])))
+        set_field(self, "positions", MappingProxyType({k: tuple(p) for k, p in fields["positions"].items()}))
+        if "name" in fields and self.name == "custom":
+            set_field(self, "name", fields["name"])
+        self._init_index()
+
+    def __reduce__(self):
+        if self.source is not None:
+            return Board.load, (self.source,)
+        return Board.from_dict, (self.to_dict(),)
+
+    def __copy__(self) -> "Board":
+        return self
+
+    def __deepcopy__(self, memo) -> "Board":
+        return self
+
+    @staticmethod
+    def fields_from_dict(data: Dict) -> Dict:
+        """Constructor arguments for the JSON map format (see ``maps/classic.json``)."""
+        try:
+            continents = {c: list(v["territories"]) for c, v in data["continents"].items()}
+            bonuses = {c: int(v["bonus"]) for c, v in data["continents"].items()}
+            adjacency = {t: list(ns) for t, ns in data["adjacency"].items()}
+            positions = {t: (p[0], p[1]) for t, p in data.get("positions", {}).items()}
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            raise MapError(f"Malformed map data: {e!r}") from e
+        return {
+            "continents": continents,
+            "adjacency": adjacency,
+            "continent_bonuses": bonuses,
+            "positions": positions,
+            "name": data.get("name", "custom"),
         }
 
-    def _init_adjacency(self) -> None:
-        a = {
-            "Alaska": ["Northwest Territory", "Alberta", "Kamchatka"],
-            "Northwest Territory": [
-                "Alaska",
-                "Alberta",
-                "Ontario",
-                "Greenland",
-            ],
-            "Greenland": ["Northwest Territory", "Ontario", "Quebec", "Iceland"],
-            "Alberta": [
-                "Alaska",
-                "Northwest Territory",
-                "Ontario",
-                "Western United States",
-            ],
-            "Ontario": [
-                "Northwest Territory",
-                "Greenland",
-                "Quebec",
-                "Eastern United States",
-                "Western United States",
-                "Alberta",
-            ],
-            "Quebec": ["Ontario", "Greenland", "Eastern United States"],
-            "Western United States": [
-                "Alberta",
-                "Ontario",
-                "Eastern United States",
-                "Central America",
-            ],
-            "Eastern United States": [
-                "Western United States",
-                "Ontario",
-                "Quebec",
-                "Central America",
-            ],
-            "Central America": [
-                "Western United States",
-                "Eastern United States",
-                "Venezuela",
-            ],
-            "Venezuela": ["Central America", "Brazil", "Peru"],
-            "Peru": ["Venezuela", "Brazil", "Argentina"],
-            "Brazil": ["Venezuela", "Peru", "Argentina", "North Africa"],
-            "Argentina": ["Peru", "Brazil"],
-            "Iceland": ["Greenland", "Great Britain", "Scandinavia"],
-            "Scandinavia": ["Iceland", "Ukraine", "Northern Europe", "Great Britain"],
-            "Ukraine": [
-                "Scandinavia",
-                "Northern Europe",
-                "Ural",
-                "Afghanistan",
-                "Middle East",
-                "Southern Europe",
-            ],
-            "Great Britain": ["Iceland", "Scandinavia", "Northern Europe", "Western Europe"],
-            "Northern Europe": [
-                "Great Britain",
-                "Scandinavia",
-                "Ukraine",
-                "Southern Europe",
-                "Western Europe",
-            ],
-            "Western Europe": ["Great Britain", "Northern Europe", "Southern Europe", "North Africa"],
-            "Southern Europe": [
-                "Western Europe",
-                "Northern Europe",
-                "Ukraine",
-                "Middle East",
-                "Egypt",
-                "North Africa",
-            ],
-            "North Africa": [
-                "Brazil",
-                "Western Europe",
-                "Southern Europe",
-                "Egypt",
-                "East Africa",
-                "Congo",
-            ],
-            "Egypt": ["Southern Europe", "Middle East", "East Africa", "North Africa"],
-            "East Africa": ["Egypt", "North Africa", "Congo", "South Africa", "Madagascar", "Middle East"],
-            "Congo": ["North Africa", "East Africa", "South Africa"],
-            "South Africa": ["Congo", "East Africa", "Madagascar"],
-            "Madagascar": ["East Africa", "South Africa"],
-            "Ural": ["Ukraine", "Siberia", "China", "Afghanistan"],
-            "Siberia": ["Ural", "Yakutsk", "Irkutsk", "Mongolia", "China"],
-            "Yakutsk": ["Siberia", "Kamchatka", "Irkutsk"],
-            "Kamchatka": ["Yakutsk", "Irkutsk", "Mongolia", "Japan", "Alaska"],
-            "Irkutsk": ["Siberia", "Yakutsk", "Kamchatka", "Mongolia"],
-            "Mongolia": ["Siberia", "Irkutsk", "Kamchatka", "Japan", "China"],
-            "Japan": ["Kamchatka", "Mongolia"],
-            "Afghanistan": ["Ukraine", "Ural", "China", "Middle East", "India"],
-            "Middle East": ["Ukraine", "Afghanistan", "India", "East Africa", "Egypt", "Southern Europe"],
-            "India": ["Middle East", "Afghanistan", "China", "Siam"],
-            "Siam": ["India", "China", "Indonesia"],
-            "China": ["Ural", "Siberia", "Mongolia", "Siam", "India", "Afghanistan"],
-            "Indonesia": ["Siam", "New Guinea", "Western Australia"],
-            "New Guinea": ["Indonesia", "Western Australia", "Eastern Australia"],
-            "Western Australia": ["Indonesia", "New Guinea", "Eastern Australia"],
-            "Eastern Australia": ["New Guinea", "Western Australia"],
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Board":
+        return cls(**cls.fields_from_dict(data))
+
+    @classmethod
+    def load(cls, name_or_path: str = DEFAULT_MAP) -> "Board":
+        """The shared board for a map in ``maps/`` or a map file path."""
+        return _shared_board(_map_path(name_or_path))
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "continents": {
+                c: {"bonus": self.continent_bonuses[c], "territories": list(members)}
+                for c, members in self.continents.items()
+            },
+            "adjacency": {t: list(ns) for t, ns in self.adjacency.items()},
+            "positions": {t: list(p) for t, p in self.positions.items()},
         }
-        self.adjacency = a
-
-    def _init_continent_bonuses(self) -> None:
-        self.continent_bonuses = {
-            "North America": 5,
-            "South America": 2,
-            "Europe": 5,
-            "Africa": 3,
-            "Asia": 7,
-            "Australia": 2,
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    def _init_index(self) -> None:
+        """Number the territories 0..N-1 so game state can live in flat arrays."""
+        territories = tuple(self.adjacency)
+        index = {t: i for i, t in enumerate(territories)}
+        neighbors = tuple(tuple(index[n] for n in self.adjacency[t]) for t in territories)
+        continent_members = {c: tuple(index[t] for t in members) for c, members in self.continents.items()}
+        # Continents numbered in declaration order, with per-territory lookup
+        continent_names = tuple(self.continents)
+        continent_of = [0] * len(territories)
+        for c, name in enumerate(continent_names):
+            for i in continent_members[name]:
+                continent_of[i] = c
+        indexed = {
+            "territories": territories,
+            "index": MappingProxyType(index),
+            "neighbors": neighbors,
+            "continent_members": MappingProxyType(continent_members),
+            "continent_names": continent_names,
+            "continent_index": MappingProxyType({c: i for i, c in enumerate(continent_names)}),
+            "continent_sizes": tuple(len(self.continents[c]) for c in continent_names),
+            "continent_bonus_values": tuple(self.continent_bonuses[c] for c in continent_names),
+            "continent_of": tuple(continent_of),
+            # Bit n of neighbor_masks[i] is set when territory n borders territory i
+            "neighbor_masks": tuple(self.mask_of(ns) for ns in neighbors),
+            "full_mask": (1 << len(territories)) - 1,
         }
+        for key, value in indexed.items():
+            object.__setattr__(self, key, value)
 
-    def _init_positions(self) -> None:
-        self.positions = {
-            # North America
-            'Alaska': (10, 100),
-            'Northwest Territory': (150, 100),
-            'Greenland': (400, 80),
-            'Alberta': (150, 200),
-            'Ontario': (250, 200),
-            'Quebec': (350, 200),
-            'Western United States': (150, 300),
-            'Eastern United States': (250, 300),
-            'Central America': (150, 400),
-            # South America
-            'Venezuela': (200, 500),
-            'Peru': (200, 600),
-            'Brazil': (300, 550),
-            'Argentina': (250, 700),
-            # Europe
-            'Iceland': (500, 150),
-            'Scandinavia': (600, 150),
-            'Great Britain': (500, 250),
-            'Northern Europe': (600, 250),
-            'Western Europe': (500, 350),
-            'Southern Europe': (600, 350),
-            'Ukraine': (700, 200),
-            # Africa
-            'North Africa': (550, 500),
-            'Egypt': (650, 450),
-            'East Africa': (700, 550),
-            'Congo': (650, 650),
-            'South Africa': (650, 750),
-            'Madagascar': (780, 780),
-            # Asia
-            'Ural': (800, 200),
-            'Siberia': (900, 150),
-            'Yakutsk': (1000, 100),
-            'Kamchatka': (1100, 100),
-            'Irkutsk': (950, 250),
-            'Mongolia': (1000, 320),
-            'Japan': (1150, 280),
-            'Afghanistan': (800, 300),
-            'Middle East': (750, 400),
-            'India': (850, 480),
-            'Siam': (950, 500),
-            'China': (900, 380),
-            # Australia
-            'Indonesia': (1000, 600),
-            'New Guinea': (1100, 600),
-            'Western Australia': (1000, 700),
-            'Eastern Australia': (1100, 700),
+    @cached_property
+    def topology_json(self) -> Tuple[str, str]:
+        """The map as the client draws it, serialised once: (JSON body, ETag)."""
+        continent_of = {t: c for c, members in self.continents.items() for t in members}
+        topology = {
+            "nodes": [
+                {
+                    "id": territory,
+                    "continent": continent_of[territory],
+                    "x": x * 1.5, # Scaling factor for better spacing
+                    "y": y * 1.5  # Scaling factor for better spacing
+                }
+                for territory, (x, y) in self.positions.items()
+            ],
+            "edges": [
+                {"from": territory, "to": neighbor}
+                for territory, neighbors in self.adjacency.items()
+                for neighbor in neighbors
+                if territory < neighbor
+            ],
+            "continents": {c: list(members) for c, members in self.continents.items()},
+            "continent_bonuses": dict(self.continent_bonuses),
         }
+        body = json.dumps(topology, separators=(",", ":"))
+        return body, hashlib.sha1(body.encode()).hexdigest()
 
-    def are_connected(self, terr1, terr2, player, territory_owner):
+    def are_connected(self, terr1: str, terr2: str, player: 'Player', territory_owner: Dict[str, 'Player']) -> bool:
         """Check if two territories are connected by a path of territories owned by the player."""
         if terr1 not in self.adjacency or terr2 not in self.adjacency:
             return False
 
-        q = [terr1]
+        q = deque([terr1])
         visited = {terr1}
 
         while q:
-            current = q.pop(0)
+            current = q.popleft()
             if current == terr2:
                 return True
             
@@ -264,25 +288,72 @@ class Board:
         
         return False
 
-    def are_connected(self, terr1: str, terr2: str, player: 'Player', territory_owner: Dict[str, 'Player']) -> bool:
-        """Check if two territories are connected by a path of territories owned by the player."""
-        if terr1 not in self.adjacency or terr2 not in self.adjacency:
-            return False
+    @staticmethod
+    def mask_of(indices) -> int:
+        indices = list(indices)
+        if len(indices) <= 64:
+            mask = 0
+            for i in indices:
+                mask |= 1 << i
+            return mask
+        # Shifting into an ever larger int is quadratic; build the digits instead
+        digits = bytearray(b"0") * (max(indices) + 1)
+        for i in indices:
+            digits[i] = ord("1")
+        digits.reverse()
+        return int(digits, 2)
 
-        q = [terr1]
-        visited = {terr1}
+    @staticmethod
+    def indices_of(mask: int) -> List[int]:
+        # Reading the binary digits is linear in the board size, unlike
+        # clearing one bit at a time
+        return [i for i, digit in enumerate(bin(mask)[:1:-1]) if digit == "1"]
 
-        while q:
-            current = q.pop(0)
-            if current == terr2:
-                return True
-            
-            for neighbor in self.adjacency[current]:
-                if neighbor not in visited and territory_owner.get(neighbor) == player:
-                    visited.add(neighbor)
-                    q.append(neighbor)
-        
-        return False
+    def neighborhood(self, mask: int) -> int:
+        """Union of the neighbours of every territory in ``mask``."""
+        neighbors = self.neighbors
+        if len(neighbors) <= 512:
+            result = 0
+            neighbor_masks = self.neighbor_masks
+            for i in self.indices_of(mask):
+                result |= neighbor_masks[i]
+            return result
+        digits = bytearray(b"0") * len(neighbors)
+        one = ord("1")
+        for i in self.indices_of(mask):
+            for n in neighbors[i]:
+                digits[n] = one
+        digits.reverse()
+        return int(digits, 2)
+
+    def frontier_mask(self, owned: int) -> int:
+        """Territories in ``owned`` that border at least one territory outside it."""
+        return owned & self.neighborhood(self.full_mask & ~owned)
+
+    def connected_components(self, owned: Set[int]) -> Tuple[List[int], List[Tuple[int, ...]]]:
+        """Split a set of territory indices into groups connected within the set.
+
+        Returns a component label for every territory (-1 outside ``owned``)
+        and the members of each component.
+        """
+        labels = [-1] * len(self.territories)
+        components: List[Tuple[int, ...]] = []
+        for start in owned:
+            if labels[start] != -1:
+                continue
+            label = len(components)
+            labels[start] = label
+            members = [start]
+            q = deque(members)
+            while q:
+                current = q.popleft()
+                for n in self.neighbors[current]:
+                    if labels[n] == -1 and n in owned:
+                        labels[n] = label
+                        members.append(n)
+                        q.append(n)
+            components.append(tuple(members))
+        return labels, components
 
     def print_board(self) -> None:
         for continent, territories in self.continents.items():
@@ -319,16 +390,113 @@ class Board:
         plt.show()
 
 
+def generate_map(
+    num_territories: int,
+    degree: float = 4.0,
+    num_continents: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Dict:
+    """Synthetic map in the JSON map format, for scaling tests.
+
+    Territories sit on a jittered square grid and only border nearby
+    territories. A random spanning tree keeps the map connected, then random
+    local borders are added until the average degree reaches ``degree``.
+    Continents are rectangular blocks of the grid, by default about seven
+    territories each, with a bonus of half their size.
+    """
+    if num_territories < 2:
+        raise MapError("A map needs at least two territories")
+    rng = random.Random(seed)
+    width = max(2, int(num_territories ** 0.5 + 0.999))
+    cells = [(i % width, i // width) for i in range(num_territories)]
+    names = [f"T{i:0{len(str(num_territories - 1))}d}" for i in range(num_territories)]
+
+    # Candidate borders: cells within ``radius`` steps on the grid
+    radius = max(1, int(degree ** 0.5 / 2 + 0.5))
+    candidates = []
+    for i, (x, y) in enumerate(cells):
+        for dy in range(0, radius + 1):
+            for dx in range(-radius, radius + 1):
+                if dy == 0 and dx <= 0:
+                    continue
+                nx, ny = x + dx, y + dy
+                j = ny * width + nx
+                if 0 <= nx < width and j < num_territories:
+                    candidates.append((i, j))
+    target_edges = int(num_territories * degree / 2)
+    if target_edges < num_territories - 1 or target_edges > len(candidates):
+        raise MapError(f"Cannot build a connected map with average degree {degree}")
+    rng.shuffle(candidates)
+
+    parent = list(range(num_territories))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    edges, extra = [], []
+    for i, j in candidates:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[ri] = rj
+            edges.append((i, j))
+        else:
+            extra.append((i, j))
+    edges.extend(extra[:target_edges - len(edges)])
+
+    adjacency: Dict[str, List[str]] = {name: [] for name in names}
+    for i, j in edges:
+        adjacency[names[i]].append(names[j])
+        adjacency[names[j]].append(names[i])
+
+    if num_continents is None:
+        num_continents = max(1, round(num_territories / 7))
+    blocks_x = max(1, round(num_continents ** 0.5))
+    blocks_y = max(1, -(-num_continents // blocks_x))
+    height = -(-num_territories // width)
+    continents: Dict[str, Dict] = {}
+    for i, (x, y) in enumerate(cells):
+        block = (y * blocks_y // height) * blocks_x + x * blocks_x // width
+        continents.setdefault(f"C{block}", {"bonus": 0, "territories": []})["territories"].append(names[i])
+    for continent in continents.values():
+        continent["bonus"] = max(1, len(continent["territories"]) // 2)
+
+    positions = {
+        names[i]: [round((x + rng.uniform(-0.3, 0.3)) * 100), round((y + rng.uniform(-0.3, 0.3)) * 100)]
+        for i, (x, y) in enumerate(cells)
+    }
+    return {
+        "name": f"synthetic-{num_territories}",
+        "continents": continents,
+        "adjacency": adjacency,
+        "positions": positions,
+    }
+
+
 def main() -> None:
     import argparse
 
     parser = argparse.ArgumentParser(description="Risk board CLI")
     parser.add_argument("--draw", action="store_true", help="Display the board graphically")
+    parser.add_argument("--map", default=DEFAULT_MAP, help="Map name in maps/ or path to a map file")
+    parser.add_argument("--generate", type=int, metavar="N", help="Generate a synthetic map with N territories")
+    parser.add_argument("--degree", type=float, default=4.0, help="Average number of neighbours for --generate")
+    parser.add_argument("--continents", type=int, help="Number of continents for --generate")
+    parser.add_argument("--seed", type=int, help="Seed for --generate")
+    parser.add_argument("--output", help="Write the generated map to this file")
     args = parser.parse_args()
 
-    board = Board()
-    print(args.draw)
-    board.draw_board()
+    if args.generate:
+        board = Board.from_dict(generate_map(args.generate, args.degree, args.continents, args.seed))
+        if args.output:
+            board.save(args.output)
+        print(f"{len(board.territories)} territories, {len(board.continents)} continents, "
+              f"{sum(map(len, board.neighbors)) // 2} borders")
+        return
+
+    board = Board.load(args.map)
     if args.draw:
         board.draw_board()
     else:
@@ -0,0 +1,252 @@
+"""Headless bot-vs-bot self-play.
+
+Plays complete games of :class:`game.Game` without Flask or console output and
+spreads large batches of games across a process pool. Run it from the command
+line to tune bots overnight::
+
+    python simulate.py --games 10000 --processes 8
+
+With ``--record games.rec`` every game is also written to a binary record
+(see :mod:`game_record`). Worker processes each append to their own file,
+``games.rec.<pid>``, since games played at the same time would otherwise
+interleave.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from game import BotStrategy, Game, GamePhase
+from game_record import GameRecordWriter
+from risk_board import DEFAULT_MAP, Board
+
+
+@dataclass
+class GameResult:
+    game_index: int
+    # Seed of the game's random streams; replaying it with the same bots
+    # reproduces the game exactly
+    seed: int
+    winner: Optional[str]  # None when the game hit the turn limit
+    turns: int
+    players: List[str] = field(default_factory=list)
+    # Territory count of each player (in ``players`` order) after every turn,
+    # starting with the initial deal.
+    territory_history: List[Tuple[int, ...]] = field(default_factory=list)
+    # Search iterations and seconds spent per player using a search strategy
+    search: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+def _territory_counts(game: Game) -> Tuple[int, ...]:
+    return tuple(p.territory_count(game) for p in game.players)
+
+
+# One record writer per file and process, kept open across the games it plays
+_writers: Dict[str, GameRecordWriter] = {}
+
+
+def _record_writer(path: str) -> GameRecordWriter:
+    writer = _writers.get(path)
+    if writer is None:
+        writer = _writers[path] = GameRecordWriter(path)
+    return writer
+
+
+def play_game(
+    seed: Optional[int] = None,
+    max_turns: int = 500,
+    game_index: int = 0,
+    strategies: Optional[Sequence[Optional[BotStrategy]]] = None,
+    map_name: str = DEFAULT_MAP,
+    record_path: Optional[str] = None,
+) -> GameResult:
+    """Play one silent game where every seat is controlled by a bot.
+
+    ``strategies`` gives each seat's :class:`game.BotStrategy`; seats without
+    one use the heuristic bot. ``map_name`` is a map in ``maps/`` or a path.
+    The game draws a fresh seed unless ``seed`` is given. With
+    ``record_path`` the game is appended to that record file.
+    """
+    game = Game(verbose=False, board=Board.load(map_name), seed=seed)
+    for seat, player in enumerate(game.players):
+        player.is_bot = True
+        if strategies is not None and seat < len(strategies) and strategies[seat] is not None:
+            # A fresh copy per game keeps search totals per game
+            player.strategy = copy.copy(strategies[seat])
+    writer = None
+    if record_path is not None:
+        writer = _record_writer(record_path)
+        writer.attach(game)
+
+    history = [_territory_counts(game)]
+    turns = 0
+    while game.phase != GamePhase.GAME_OVER and turns < max_turns:
+        game.run_bot_turn()
+        turns += 1
+        history.append(_territory_counts(game))
+    if writer is not None:
+        # Pool workers exit without running finalizers, so write the game out now
+        writer.flush()
+
+    winner = None
+    if game.phase == GamePhase.GAME_OVER:
+        survivors = [p.name for p in game.players if p.has_territories(game)]
+        if len(survivors) == 1:
+            winner = survivors[0]
+
+    return GameResult(
+        game_index=game_index,
+        seed=game.seed,
+        winner=winner,
+        turns=turns,
+        players=[p.name for p in game.players],
+        territory_history=history,
+        search={
+            p.name: {"iterations": p.strategy.total_iterations, "seconds": p.strategy.total_seconds}
+            for p in game.players
+            if hasattr(p.strategy, "total_iterations")
+        },
+    )
+
+
+def _play_indexed(
+    game_index: int,
+    base_seed: Optional[int],
+    max_turns: int,
+    strategies: Optional[Sequence[Optional[BotStrategy]]],
+    map_name: str,
+    record_path: Optional[str] = None,
+    per_process: bool = False,
+) -> GameResult:
+    seed = None if base_seed is None else base_seed + game_index
+    if record_path is not None and per_process:
+        record_path = f"{record_path}.{os.getpid()}"
+    return play_game(
+        seed=seed, max_turns=max_turns, game_index=game_index, strategies=strategies, map_name=map_name,
+        record_path=record_path,
+    )
+
+
+def run_games(
+    num_games: int,
+    seed: Optional[int] = None,
+    processes: Optional[int] = None,
+    max_turns: int = 500,
+    chunksize: Optional[int] = None,
+    strategies: Optional[Sequence[Optional[BotStrategy]]] = None,
+    map_name: str = DEFAULT_MAP,
+    record_path: Optional[str] = None,
+) -> List[GameResult]:
+    """Play ``num_games`` games, in parallel unless ``processes`` is 1.
+
+    Game ``i`` is seeded with ``seed + i`` so a batch is reproducible for a
+    fixed base seed regardless of how games are spread over workers. Two
+    batches with the same base seed deal the same boards and decks and roll
+    from the same dice streams, so comparing bots that way (common random
+    numbers) needs far fewer games than independent batches.
+
+    With ``record_path``, games played in this process are appended to that
+    file and games played by workers to ``<record_path>.<pid>``.
+    """
+    worker = partial(
+        _play_indexed, base_seed=seed, max_turns=max_turns, strategies=strategies, map_name=map_name,
+        record_path=record_path,
+    )
+    if processes == 1:
+        return [worker(i) for i in range(num_games)]
+    worker = partial(worker, per_process=True)
+
+    processes = processes or os.cpu_count() or 1
+    if chunksize is None:
+        # A few chunks per worker keeps IPC overhead low while still balancing load
+        chunksize = max(1, num_games // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(worker, range(num_games), chunksize=chunksize))
+
+
+def summarize(results: List[GameResult]) -> Dict:
+    wins: Dict[str, int] = {}
+    draws = 0
+    for r in results:
+        if r.winner is None:
+            draws += 1
+        else:
+            wins[r.winner] = wins.get(r.winner, 0) + 1
+    total_turns = sum(r.turns for r in results)
+    summary = {
+        "games": len(results),
+        "wins": wins,
+        "draws": draws,
+        "avg_turns": total_turns / len(results) if results else 0.0,
+    }
+
+    search: Dict[str, List[float]] = {}
+    for r in results:
+        for name, stats in r.search.items():
+            totals = search.setdefault(name, [0, 0.0])
+            totals[0] += stats["iterations"]
+            totals[1] += stats["seconds"]
+    if search:
+        summary["search_iterations_per_second"] = {
+            name: round(iterations / seconds) if seconds else None for name, (iterations, seconds) in search.items()
+        }
+    return summary
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless Risk self-play")
+    parser.add_argument("--games", type=int, default=100, help="Number of games to play")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None, help="Base seed for reproducible batches")
+    parser.add_argument("--max-turns", type=int, default=500, help="Turn limit before a game counts as a draw")
+    parser.add_argument("--output", help="Write per-game results to this JSON lines file")
+    parser.add_argument("--map", default=DEFAULT_MAP, help="Map name in maps/ or path to a map file")
+    parser.add_argument("--record", help="Append every game to this binary record file (one per worker process)")
+    parser.add_argument("--mcts-seat", type=int, action="append", default=[],
+                        help="Seat played by the MCTS bot instead of the heuristic bot (repeatable)")
+    parser.add_argument("--mcts-iterations", type=int, default=200, help="MCTS iterations per decision")
+    parser.add_argument("--expectimax-seat", type=int, action="append", default=[],
+                        help="Seat played by the expectimax attack planner (repeatable)")
+    args = parser.parse_args()
+
+    strategies = None
+    if args.mcts_seat or args.expectimax_seat:
+        from expectimax import ExpectimaxBot
+        from mcts import MCTSBot
+
+        seats = args.mcts_seat + args.expectimax_seat
+        strategies = [None] * (max(seats) + 1)
+        for seat in args.mcts_seat:
+            strategies[seat] = MCTSBot(time_budget=None, iterations=args.mcts_iterations)
+        for seat in args.expectimax_seat:
+            strategies[seat] = ExpectimaxBot()
+
+    start = time.perf_counter()
+    results = run_games(
+        args.games, seed=args.seed, processes=args.processes, max_turns=args.max_turns, strategies=strategies,
+        map_name=args.map, record_path=args.record,
+    )
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        with open(args.output, "w") as f:
+            for r in results:
+                f.write(json.dumps(asdict(r)) + "\n")
+
+    summary = summarize(results)
+    summary["seconds"] = round(elapsed, 3)
+    summary["games_per_second"] = round(len(results) / elapsed, 1) if elapsed > 0 else None
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const statusEl = document.getElementById('game-status');
     const actionBtn = document.getElementById('action-btn');
     const restartBtn = document.getElementById('restart-btn');
+    const undoBtn = document.getElementById('undo-btn');
     const playerHandContainer = document.getElementById('player-hand-container');
     const tradeInBtn = document.getElementById('trade-in-btn');
     const botActionEl = document.getElementById('bot-action');
@@ -14,6 +15,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let gameState = {};
     let selectedTerritory = null;
     let nodes, edges;
+    let stateVersion = null; // Version of the last state received; later polls ask only for changes
     let selectedCards = [];
     let isProcessingBotActions = false;
     let nextCardTradeInBonus = 4; // Initial trade-in bonus
@@ -33,6 +35,14 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     tradeInBtn.addEventListener('click', handleTradeIn);
+
+    undoBtn.addEventListener('click', async () => {
+        // Only deploy and fortify moves of the current turn can be taken back
+        const result = await apiPost('/api/undo', {});
+        if (result && !result.success) {
+            alert(result.error);
+        }
+    });
     
     restartBtn.addEventListener('click', async () => {
         const confirmed = confirm('Are you sure you want to restart the game?');
@@ -83,6 +93,14 @@ document.addEventListener('DOMContentLoaded', function() {
                         message += `\n\nYou conquered ${result.conquest_move_details.to_terr}!`;
                     }
                     alert(message);
+                } else if (url === '/api/blitz' && result.success) {
+                    let message = `Blitz Results:\n` +
+                                  `Attacker lost: ${result.attack_losses} armies\n` +
+                                  `Defender lost: ${result.defend_losses} armies`;
+                    if (result.conquered) {
+                        message += `\n\nYou conquered ${result.conquest_move_details.to_terr}!`;
+                    }
+                    alert(message);
                 }
 
                 await fetchGameState(); // Refresh state after every action
@@ -99,38 +117,106 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    async function fetchGameState() {
-        try {
-            const response = await fetch('/api/game_state');
-            gameState = await response.json();
-            drawBoard(gameState);
-            updateStatus();
-            console.log("Cards received:", gameState.human_cards);
-            updatePlayerHand(gameState.human_cards);
-
-            // Make sure player hand container is visible
-            if (playerHandContainer) {
-                playerHandContainer.style.display = 'block';
-            }
+    async function loadTopology() {
+        // The board layout never changes during a game, so it is fetched once
+        const response = await fetch('/api/topology');
+        const topology = await response.json();
+        nodes = new vis.DataSet(topology.nodes.map(node => ({ id: node.id, label: node.id, x: node.x, y: node.y })));
+        edges = new vis.DataSet(topology.edges);
 
-            // Display card rules info
-            updateCardRules();
+        const groups = {};
+        Object.keys(playerColors).forEach(player => {
+            groups[player] = {
+                color: { background: playerColors[player], border: playerColors[player] },
+                font: { color: 'white' }
+            };
+        });
 
-            if (gameState.phase === 'ATTACK_MOVE' && gameState.current_player === 'Human' && gameState.conquest_move_details) {
-                // Use a timeout to ensure the user sees the board update before the prompt
-                setTimeout(handleAttackMove, 100); 
+        const options = {
+            nodes: {
+                shape: 'box',
+                size: 20,
+                borderWidth: 2,
+                shadow: true,
+                font: {
+                    size: 14,
+                    color: '#000',
+                    multi: true,
+                    face: 'arial'
+                }
+            },
+            edges: {
+                width: 2,
+                shadow: true
+            },
+            groups: groups,
+            physics: {
+                enabled: false
+            },
+            interaction: {
+                dragNodes: false,
+                dragView: true,
+                zoomView: true
             }
-            
-            // Check if it's the bot's turn and start polling for bot actions
-            if (gameState.current_player === 'Bot' && !isProcessingBotActions) {
-                isProcessingBotActions = true;
-                processBotActions();
+        };
+
+        network = new vis.Network(container, { nodes, edges }, options);
+        network.on("click", handleNetworkClick);
+    }
+
+    async function fetchGameState() {
+        try {
+            if (!network) {
+                await loadTopology();
             }
+            const url = stateVersion === null ? '/api/game_state' : `/api/game_state?since=${stateVersion}`;
+            const response = await fetch(url);
+            applyGameState(await response.json());
         } catch (error) {
             console.error('Error fetching game state:', error);
         }
     }
 
+    function applyGameState(state) {
+        gameState = state;
+        stateVersion = gameState.version;
+        drawBoard(gameState);
+        updateStatus();
+        console.log("Cards received:", gameState.human_cards);
+        updatePlayerHand(gameState.human_cards);
+
+        // Make sure player hand container is visible
+        if (playerHandContainer) {
+            playerHandContainer.style.display = 'block';
+        }
+
+        // Display card rules info
+        updateCardRules();
+
+        if (gameState.phase === 'ATTACK_MOVE' && gameState.current_player === 'Human' && gameState.conquest_move_details) {
+            // Use a timeout to ensure the user sees the board update before the prompt
+            setTimeout(handleAttackMove, 100); 
+        }
+        
+        // Check if it's the bot's turn and start streaming its actions
+        if (gameState.current_player === 'Bot' && !isProcessingBotActions) {
+            isProcessingBotActions = true;
+            processBotActions();
+        }
+    }
+
+    async function fetchAttackOdds(fromTerr, toTerr) {
+        try {
+            const params = new URLSearchParams({ from_terr: fromTerr, to_terr: toTerr });
+            const response = await fetch(`/api/attack_odds?${params}`);
+            const result = await response.json();
+            return result.success ? result : null;
+        } catch (error) {
+            console.error('Error fetching attack odds:', error);
+            return null;
+        }
+    }
+
     async function handleAttackMove() {
         const details = gameState.conquest_move_details;
         if (!details) return;
@@ -255,53 +341,9 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function drawBoard(data) {
-        // Create a DataSet for nodes and edges
-        nodes = new vis.DataSet(data.nodes);
-        edges = new vis.DataSet(data.edges);
-
-        const groups = {};
-        data.players.forEach(player => {
-            groups[player] = {
-                color: { background: playerColors[player], border: playerColors[player] },
-                font: { color: 'white' }
-            };
-        });
+        // Only territories that changed since the last poll are included
+        nodes.update(data.nodes);
 
-        const options = {
-            nodes: {
-                shape: 'box',
-                size: 20,
-                borderWidth: 2,
-                shadow: true,
-                font: {
-                    size: 14,
-                    color: '#000',
-                    multi: true,
-                    face: 'arial'
-                }
-            },
-            edges: {
-                width: 2,
-                shadow: true
-            },
-            groups: groups,
-            physics: {
-                enabled: false
-            },
-            interaction: {
-                dragNodes: false,
-                dragView: true,
-                zoomView: true
-            }
-        };
-
-        if (!network) {
-            network = new vis.Network(container, { nodes, edges }, options);
-            network.on("click", handleNetworkClick);
-        } else {
-            network.setData({ nodes, edges });
-        }
-        
         // After an action, the selected territory might no longer be valid for another action.
         if (selectedTerritory) {
             const selectedNodeData = nodes.get(selectedTerritory);
@@ -381,9 +423,13 @@ document.addEventListener('DOMContentLoaded', function() {
                     if (neighborIds.includes(clickedNodeId)) {
                         const maxArmies = parseInt(selectedNode.label.split('\n')[1]) - 1;
                         const numToSuggest = Math.min(3, maxArmies);
-                        const numArmiesStr = prompt(`Attack ${clickedNodeId} from ${selectedTerritory} with how many armies? (1-${numToSuggest})`, numToSuggest);
+                        const odds = await fetchAttackOdds(selectedTerritory, clickedNodeId);
+                        const oddsText = odds ? `\nChance to conquer if you keep attacking: ${(odds.win_probability * 100).toFixed(1)}%` : '';
+                        const numArmiesStr = prompt(`Attack ${clickedNodeId} from ${selectedTerritory} with how many armies? (1-${numToSuggest}, or "blitz" to fight until the battle is decided)${oddsText}`, numToSuggest);
                         
-                        if (numArmiesStr) {
+                        if (numArmiesStr && numArmiesStr.trim().toLowerCase() === 'blitz') {
+                            await apiPost('/api/blitz', { from_terr: selectedTerritory, to_terr: clickedNodeId });
+                        } else if (numArmiesStr) {
                             const numArmies = parseInt(numArmiesStr);
                             if (numArmies > 0 && numArmies <= maxArmies && numArmies <= 3) {
                                 await apiPost('/api/attack', { from_terr: selectedTerritory, to_terr: clickedNodeId, armies: numArmies });
@@ -478,76 +524,62 @@ Next card set will be worth ${result.next_bonus} reinforcements.`);
         `;
     }
 
-    // Function to process bot actions one by one
-    async function processBotActions() {
+    // Run the bot's turn and play back its actions as the server pushes them
+    function processBotActions() {
         if (botActionEl) botActionEl.style.display = 'block';
-        
-        try {
-            // Execute the bot turn first
-            console.log('Executing bot turn');
-            try {
-                const executeBotTurnResponse = await fetch('/api/execute_bot_turn', {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' }
-                });
-                
-                const executeBotResult = await executeBotTurnResponse.json();
-                console.log('Bot turn execution result:', executeBotResult);
-                
-                if (!executeBotResult.success) {
-                    console.error('Failed to execute bot turn:', executeBotResult.error);
-                }
-            } catch (error) {
-                console.error('Error executing bot turn:', error);
-            }
-            
-            // Now process bot actions
-            while (gameState.current_player === 'Bot' && !gameState.winner) {
-                // Fetch next bot action
-                const response = await fetch('/api/bot_action');
-                const result = await response.json();
-                
-                if (!result || !result.action) {
-                    console.log('No more bot actions');
-                    break;
-                }
-                
-                const action = result.action;
+
+        const url = stateVersion === null ? '/api/bot_stream' : `/api/bot_stream?since=${stateVersion}`;
+        const source = new EventSource(url);
+        // Actions arrive faster than they are shown, so chain their display
+        let playback = Promise.resolve();
+
+        const finish = () => {
+            source.close();
+            playback = playback.finally(() => {
+                isProcessingBotActions = false;
+                if (botActionEl) botActionEl.style.display = 'none';
+                return fetchGameState();
+            });
+        };
+
+        source.addEventListener('bot_action', event => {
+            const { action, state } = JSON.parse(event.data);
+            playback = playback.then(async () => {
                 console.log('Bot action:', action);
-                
+
                 // Display the bot action
                 if (botActionEl) {
                     botActionEl.innerHTML = `<strong>Bot Action:</strong> ${action.message}`;
                     botActionEl.classList.add('highlight');
-                    
+
                     // Remove highlight after a moment
                     setTimeout(() => {
                         botActionEl.classList.remove('highlight');
                     }, 1000);
                 }
-                
-                // Special handling for different action types
-                if (action.type === 'game_over') {
-                    alert('Game over! Bot has won!');
-                    break;
-                }
-                
+                applyGameState(state);
+
                 // Wait before proceeding to next action (for visual effect)
                 await new Promise(resolve => setTimeout(resolve, 1500));
-                
-                // Refresh game state after each action to see changes
-                await fetchGameState();
-            }
-            
-            // Final refresh after all actions
-            await fetchGameState();
-            
-        } catch (error) {
-            console.error('Error processing bot actions:', error);
-        } finally {
-            isProcessingBotActions = false;
-            if (botActionEl) botActionEl.style.display = 'none';
-        }
+            });
+        });
+
+        source.addEventListener('done', event => {
+            const { state } = JSON.parse(event.data);
+            playback = playback.then(() => applyGameState(state));
+            finish();
+        });
+
+        source.addEventListener('bot_error', event => {
+            console.error('Failed to execute bot turn:', JSON.parse(event.data).error);
+            finish();
+        });
+
+        // Connection problems; stop instead of letting EventSource reconnect and rerun the turn
+        source.onerror = error => {
+            console.error('Bot action stream error:', error);
+            finish();
+        };
     }
 
     // Initialize the game
@@ -0,0 +1,128 @@
+"""Zobrist hashing of game positions and a transposition table keyed by it.
+
+A position's hash is the XOR of one random 64-bit key per (territory, owner,
+army bucket), one for the phase and one for the player to move. Changing a
+single territory therefore updates the hash with two XORs, see
+:meth:`game.Game._set_armies`. Keys come from a fixed seed so hashes agree
+across processes and runs.
+
+Army counts are bucketed: they are exact up to ``EXACT_ARMIES`` and grow
+coarser above it, so positions that only differ inside a large stack share a
+hash. Cards, the deck and the trade-in bonus are not part of the hash.
+Searches that must tell such positions apart add :meth:`ZobristKeys.army_term`,
+a hash of the exact army counts that also updates in constant time.
+"""
+
+from __future__ import annotations
+
+import random
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+EXACT_ARMIES = 12
+NUM_BUCKETS = 32
+NUM_PHASES = 8
+MAX_PLAYERS = 8
+SEED = 0x5EED_2150
+MASK = (1 << 64) - 1
+
+
+def army_bucket(armies: int) -> int:
+    if armies <= EXACT_ARMIES:
+        return armies
+    # 13, 14-15, 16-19, 20-27, ... share a bucket
+    return min(EXACT_ARMIES + (armies - EXACT_ARMIES).bit_length(), NUM_BUCKETS - 1)
+
+
+class ZobristKeys:
+    """Random keys for one board size and number of seats.
+
+    Use :func:`zobrist_keys` to get the shared instance; pickling stores only
+    the dimensions.
+    """
+
+    def __init__(self, num_territories: int, num_seats: int):
+        self.num_territories = num_territories
+        self.num_seats = num_seats
+        rng = random.Random(SEED ^ (num_territories << 8) ^ num_seats)
+        # Flat table indexed by (territory * num_seats + seat) * NUM_BUCKETS + bucket
+        self.territory = [rng.getrandbits(64) for _ in range(num_territories * num_seats * NUM_BUCKETS)]
+        self.phase = [rng.getrandbits(64) for _ in range(NUM_PHASES)]
+        self.player = [rng.getrandbits(64) for _ in range(MAX_PLAYERS)]
+        # Odd multipliers for the exact army hash, drawn last so the keys above are unchanged
+        self.army = [rng.getrandbits(64) | 1 for _ in range(num_territories)]
+
+    def __reduce__(self):
+        return zobrist_keys, (self.num_territories, self.num_seats)
+
+    def key(self, territory: int, seat: int, armies: int) -> int:
+        return self.territory[(territory * self.num_seats + seat) * NUM_BUCKETS + army_bucket(armies)]
+
+    def army_term(self, army_counts) -> int:
+        """Hash of the exact army counts; changing territory ``i`` by ``n`` adds ``n * army[i]``."""
+        return sum(n * k for n, k in zip(army_counts, self.army)) & MASK
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(num_territories: int, num_seats: int) -> ZobristKeys:
+    return ZobristKeys(num_territories, num_seats)
+
+
+class TranspositionTable:
+    """Fixed-size cache of search results keyed by position hash.
+
+    Each hash maps to one slot. A new entry replaces the one in its slot if
+    that slot holds the same position, an entry from an earlier search (see
+    :meth:`new_search`), or one searched no deeper than the new entry.
+    Entries from earlier searches are never returned.
+    """
+
+    def __init__(self, size: int = 1 << 16):
+        self.size = size
+        # (hash, depth, generation, value) or None
+        self._slots: List[Optional[Tuple[int, int, int, Any]]] = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._used = 0
+
+    def __len__(self) -> int:
+        return self._used
+
+    def new_search(self) -> None:
+        """Mark current entries as stale: they are no longer returned and are the first to be replaced."""
+        self.generation += 1
+
+    def get(self, key: int, min_depth: int = 0) -> Optional[Any]:
+        """The value stored for ``key`` in the current search if it was searched at least ``min_depth`` deep."""
+        slot = self._slots[key % self.size]
+        if slot is not None and slot[0] == key and slot[1] >= min_depth and slot[2] == self.generation:
+            self.hits += 1
+            return slot[3]
+        self.misses += 1
+        return None
+
+    def store(self, key: int, value: Any, depth: int = 0) -> bool:
+        """Store ``value`` unless a more valuable entry holds the slot; return whether it was stored."""
+        index = key % self.size
+        slot = self._slots[index]
+        if slot is None:
+            self._used += 1
+        elif slot[0] != key and slot[2] == self.generation and slot[1] > depth:
+            return False
+        self._slots[index] = (key, depth, self.generation, value)
+        return True
+
+    def clear(self) -> None:
+        self._slots = [None] * self.size
+        self.generation = self.hits = self.misses = self._used = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": self.size,
+            "used": self._used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }